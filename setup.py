@@ -58,7 +58,8 @@ setuptools.setup(
     ],
     python_requires='>=3.5',
     extras_require={
-        'dev': ['check-manifest']
+        'dev': ['check-manifest'],
+        'numpy': ['numpy']
     },
     entry_points={
         'console_scripts': ['refind=refind.__main__:main']
@@ -23,27 +23,95 @@
 import os
 import sys
 import threading
+import copy
+import concurrent.futures
+import asyncio
 from enum import Enum
 import enum
 import fnmatch
 import re
+try:
+    # Python 3.11+
+    from re import _parser as sre_parse
+except ImportError:
+    import sre_parse
+import string
 import subprocess
 import time
 import math
+import operator
 from datetime import datetime, timedelta
 import glob
 import stat
 import io
+import mmap
 import textwrap
-from typing import Any, Union, List
+from typing import Any, Union, List, Iterator, AsyncIterator, Callable
 
 __version__ = '1.0.7'
 PACKAGE_NAME = 'refind'
 
+class _IdNameCache:
+    '''
+    Caches the names of user or group IDs and the IDs of names, including those which don't exist,
+    so that each is only looked up once. Lookups may be network round trips under LDAP or SSSD.
+    '''
+    def __init__(self, get_name, get_id, get_all):
+        '''
+        Inputs: get_name - Returns the name of the given ID or raises KeyError
+                get_id - Returns the ID of the given name or raises KeyError
+                get_all - Returns an iterable of (ID, name) for every entry of the table
+        '''
+        self._get_name = get_name
+        self._get_id = get_id
+        self._get_all = get_all
+        # None is cached for missing entries; concurrent misses may just look up the same entry
+        self._names = {}
+        self._ids = {}
+        self._preloaded = False
+
+    def get_name(self, id:int) -> Union[str,None]:
+        ''' Returns the name of the given ID or None when it has no name '''
+        try:
+            return self._names[id]
+        except KeyError:
+            pass
+        try:
+            name = self._get_name(id)
+        except KeyError:
+            name = None
+        self._names[id] = name
+        return name
+
+    def get_id(self, name:str) -> Union[int,None]:
+        ''' Returns the ID of the given name or None when the name doesn't exist '''
+        try:
+            return self._ids[name]
+        except KeyError:
+            pass
+        try:
+            id = self._get_id(name)
+        except KeyError:
+            id = None
+        self._ids[name] = id
+        return id
+
+    def preload(self) -> None:
+        '''
+        Caches every entry of the table in one pass. Entries which the system doesn't enumerate
+        are still looked up once they are needed.
+        '''
+        if not self._preloaded:
+            for id, name in self._get_all():
+                self._names.setdefault(id, name)
+                self._ids.setdefault(name, id)
+            self._preloaded = True
+
 try:
     import grp
 except ModuleNotFoundError:
     GID_ENABLED = False
+    _group_names = None
 
     def _group_id_to_name(id:int) -> str:
         return 'N/A'
@@ -52,17 +120,28 @@ except ModuleNotFoundError:
         return -1
 else:
     GID_ENABLED = True
+    _group_names = _IdNameCache(
+        lambda id: grp.getgrgid(id).gr_name,
+        lambda name: grp.getgrnam(name).gr_gid,
+        lambda: ((group.gr_gid, group.gr_name) for group in grp.getgrall())
+    )
 
     def _group_id_to_name(id:int) -> str:
-        return grp.getgrgid(id).gr_name
+        # Same as find, the ID is used when it has no name
+        name = _group_names.get_name(id)
+        return name if name is not None else str(id)
 
-    def _group_name_to_id(name:str) ->int:
-        return grp.getgrnam(name).gr_gid
+    def _group_name_to_id(name:str) -> int:
+        id = _group_names.get_id(name)
+        if id is None:
+            raise KeyError('getgrnam(): name not found: {}'.format(name))
+        return id
 
 try:
     import pwd
 except ModuleNotFoundError:
     UID_ENABLED = False
+    _user_names = None
 
     def _user_id_to_name(id:int) -> str:
         return 'N/A'
@@ -71,16 +150,92 @@ except ModuleNotFoundError:
         return -1
 else:
     UID_ENABLED = True
+    _user_names = _IdNameCache(
+        lambda id: pwd.getpwuid(id).pw_name,
+        lambda name: pwd.getpwnam(name).pw_uid,
+        lambda: ((user.pw_uid, user.pw_name) for user in pwd.getpwall())
+    )
 
     def _user_id_to_name(id:int) -> str:
-        return pwd.getpwuid(id).pw_name
+        # Same as find, the ID is used when it has no name
+        name = _user_names.get_name(id)
+        return name if name is not None else str(id)
 
     def _user_name_to_id(name:str) -> int:
-        return pwd.getpwnam(name).pw_uid
+        id = _user_names.get_id(name)
+        if id is None:
+            raise KeyError('getpwnam(): name not found: {}'.format(name))
+        return id
+
+try:
+    import numpy
+except ModuleNotFoundError:
+    # Batches of items are matched one item at a time instead
+    NUMPY_ENABLED = False
+else:
+    NUMPY_ENABLED = True
+
+# Directories with fewer items than this are matched one item at a time even when NumPy is installed
+MIN_BATCH_SIZE = 64
+
+# An ordered parallel walk lists at most this many directories per worker thread ahead of the one
+# being handled
+LISTING_AHEAD_PER_WORKER = 4
+
+def _preload_id_names():
+    ''' Caches all user and group names known to the system '''
+    if _user_names is not None:
+        _user_names.preload()
+    if _group_names is not None:
+        _group_names.preload()
 
 def _is_windows():
     return sys.platform.lower().startswith('win')
 
+# The effective user ID and the set of group IDs of this process; set once first needed
+_credentials = None
+
+def _get_credentials():
+    ''' Returns the tuple (euid, groups) of this process or None when not supported by the OS '''
+    global _credentials
+    if _credentials is None:
+        if not hasattr(os, 'geteuid'):
+            return None
+        groups = set(os.getgroups())
+        groups.add(os.getegid())
+        _credentials = (os.geteuid(), groups)
+    return _credentials
+
+# Maps a directory path to the os.statvfs() flags of the mount it is on; st_dev can't be used as
+# the key since bind mounts share it with their source while their flags may differ
+_mount_flags = {}
+# The number of directories kept in _mount_flags; items of a directory are normally matched together
+_MOUNT_FLAGS_CACHE_SIZE = 1024
+
+def _get_mount_flags(dir_path:str) -> int:
+    ''' Returns the os.statvfs() flags of the mount that the given directory is on '''
+    flags = _mount_flags.get(dir_path, None)
+    if flags is None:
+        try:
+            flags = os.statvfs(dir_path).f_flag
+        except (OSError, AttributeError):
+            flags = 0
+        if len(_mount_flags) >= _MOUNT_FLAGS_CACHE_SIZE:
+            _mount_flags.clear()
+        _mount_flags[dir_path] = flags
+    return flags
+
+def _fnmatch_compile(pattern:str) -> Callable[[str], Any]:
+    '''
+    Returns a function which returns a match object when the given name matches pattern, or None
+    otherwise. This is the same as fnmatch.fnmatch() without the per call overhead.
+    '''
+    match = re.compile(fnmatch.translate(os.path.normcase(pattern))).match
+    if os.path.normcase('A') == 'A':
+        # Case sensitive file system - names don't need to be converted
+        return match
+    return lambda name: match(os.path.normcase(name))
+
 class SharedFileWriter:
     ''' Simple file writer used when multiple objects need to write to the same file '''
     files = {}
@@ -141,17 +296,116 @@ class LogicOperation(Enum):
     OR = enum.auto()
     AND = enum.auto()
 
+class WalkOrder(Enum):
+    NAME = enum.auto() # Directories then files, each sorted by name
+    READDIR = enum.auto() # The order the file system lists each directory, without buffering
+    INODE = enum.auto() # Sorted by inode number
+
+class FollowLinks(Enum):
+    NEVER = enum.auto() # -P: Symbolic links are never followed
+    ALWAYS = enum.auto() # -L: Symbolic links are always followed
+    ROOTS = enum.auto() # -H: Symbolic links are only followed when given as a root
+
+class MatchCost(enum.IntEnum):
+    ''' Relative cost of matching an item, used to order operands when optimizing '''
+    FREE = 0 # No data about the item is needed
+    NAME = 1 # Name or path only
+    TYPE = 2 # Item type, usually from d_type
+    STAT = 3 # A call to stat
+    SYSCALL = 4 # Another system call on the item
+    LISTDIR = 5 # Listing a directory
+    CONTENT = 6 # Reading the contents of a file
+
+class PathData(enum.Flag):
+    ''' Flags of the data about an item which a matcher or action needs '''
+    NAME = enum.auto() # Name, path, and depth only
+    TYPE = enum.auto() # Item type; taken from d_type without a call to stat for most items
+    STAT = enum.auto() # Full stat data
+    TIMES = enum.auto() # Stat times converted to datetime
+    OWNER = enum.auto() # User and group names
+    LINK = enum.auto() # Symbolic link target
+    ALL = NAME | TYPE | STAT | TIMES | OWNER | LINK
+
+def _format_keys(format:str) -> Iterator[str]:
+    ''' Generates the name of each key referenced by the given Python format string '''
+    for _, field_name, format_spec, _ in string.Formatter().parse(format):
+        if field_name is not None:
+            yield re.split(r'[.\[]', field_name, maxsplit=1)[0]
+        if format_spec:
+            # Nested replacement fields
+            yield from _format_keys(format_spec)
+
+class _DirRecord:
+    ''' The data shared by all items of one directory '''
+    __slots__ = ('find_root', 'root', 'depth', 'follow_links', '_rel_dir')
+
+    def __init__(self, find_root, root, depth, follow_links):
+        '''
+        Inputs: find_root - The root that we are interrogating
+                root - The directory path of the items or an empty string for find_root itself
+                depth - The depth of the items or None when it should be computed from root
+                follow_links - Set when symbolic links are followed for the items
+        '''
+        self.find_root = find_root
+        self.root = root
+        self.depth = depth
+        self.follow_links = follow_links
+        # Computed once needed
+        self._rel_dir = None
+
+    @property
+    def rel_dir(self):
+        if self._rel_dir is None:
+            rel_dir = self.root[len(self.find_root):]
+            if rel_dir:
+                rel_dir = os.path.normpath(rel_dir)
+                if rel_dir.startswith(os.sep):
+                    rel_dir = rel_dir[1:]
+            self._rel_dir = rel_dir
+        return self._rel_dir
+
 class PathParser:
     ''' This class helps to parse each element that needs to be matched/executed in find '''
-    def __init__(self, find_root, path_split=None):
+
+    # Kept compact since a walk may return millions of these; the directory part is shared by all
+    # items of the same directory, and os.DirEntry is released once the item was handled
+    __slots__ = ('_dir', '_name', '_dir_entry', '_stat', '_flags')
+
+    # Bits of _flags
+    # Set when a matcher or action requests that this directory is not descended into
+    _PRUNED = 0x1
+    # Set when an action requests that the walk stops after this item
+    _QUIT_REQUESTED = 0x2
+    # Set once this directory was found to have no items, so that it isn't listed again
+    _EMPTY_DIR = 0x4
+    # Set once os.DirEntry was released; the bits below then hold the type given by its d_type
+    _D_TYPE_KNOWN = 0x8
+    _D_TYPE_DIR = 0x10
+    _D_TYPE_FILE = 0x20
+    _D_TYPE_LINK = 0x40
+
+    def __init__(
+            self,
+            find_root,
+            path_split=None,
+            dir_entry:os.DirEntry=None,
+            depth:int=None,
+            follow_links:bool=False
+    ):
         '''
         Initialize the PathParser object for use with Finder.
         Inputs: find_root - The root that we are interrogating
                 path_split - When set, A 2-item tuple or list containing the head and tail of the
                              path; the head must begin with find_root and must be a directory
                              When not set, find_root is the path being interrogated
+                dir_entry - The os.DirEntry for this item when it was found using os.scandir();
+                            type and stat data are taken from this instead of calling os.stat()
+                depth - The depth of this item when known by the caller; computed from path_split
+                        when not set
+                follow_links - When True, type and stat data are of the file that a symbolic link
+                               points to, unless the link is broken; when False, type and stat
+                               data are of the link itself
         '''
-        self._find_root = find_root
         if path_split:
             if len(path_split) != 2:
                 raise ValueError('path_split is not length of 2: {}'.format(path_split))
@@ -159,39 +413,76 @@ class PathParser:
                 raise ValueError(
                     'Expected root "{}" to begin with find_root "{}"'.format(path_split[0], find_root)
                 )
-            self._root = path_split[0]
+            self._dir = _DirRecord(find_root, path_split[0], depth, follow_links)
             self._name = path_split[1]
-            self._rel_dir = self._root[len(find_root):]
-            if self._rel_dir:
-                self._rel_dir = os.path.normpath(self._rel_dir)
-                if self._rel_dir.startswith(os.sep):
-                    self._rel_dir = self._rel_dir[1:]
-            self._full_path = os.path.join(self._root, self._name)
         else:
-            self._root = ''
-            self._rel_dir = ''
+            self._dir = _DirRecord(find_root, '', depth, follow_links)
             self._name = find_root
-            self._full_path = find_root
+        self._dir_entry = dir_entry
         # Saves value of previous call to os.stat()
         self._stat = None
+        self._flags = 0
+
+    @classmethod
+    def _from_dir_entry(cls, dir_record:_DirRecord, dir_entry:os.DirEntry):
+        '''
+        Returns a PathParser for the given item listed by os.scandir() from dir_record.root. This
+        skips the checks done in __init__ since Finder lists each directory itself.
+        '''
+        path_parser = cls.__new__(cls)
+        path_parser._dir = dir_record
+        path_parser._name = dir_entry.name
+        path_parser._dir_entry = dir_entry
+        path_parser._stat = None
+        path_parser._flags = 0
+        return path_parser
+
+    # Converts each key of the dictionary returned by to_pydict() to the PathData needed for it;
+    # keys starting with st_ need PathData.STAT and all others need PathData.NAME
+    PYDICT_KEY_DATA = {
+        'type': PathData.TYPE,
+        'mode_oct': PathData.STAT,
+        'perm_oct': PathData.STAT,
+        'perm': PathData.STAT,
+        'atime': PathData.TIMES,
+        'ctime': PathData.TIMES,
+        'mtime': PathData.TIMES,
+        'group': PathData.OWNER,
+        'user': PathData.OWNER,
+        'link': PathData.LINK
+    }
+
+    def __getstate__(self):
+        # os.DirEntry can't be pickled; stat is fetched again if needed
+        return {
+            '_dir': self._dir,
+            '_name': self._name,
+            '_stat': self._stat,
+            '_flags': self._flags | self._d_type_flags()
+        }
+
+    def __setstate__(self, state):
+        self._dir_entry = None
+        for key, value in state.items():
+            setattr(self, key, value)
 
     @property
     def find_root(self):
         ''' Returns the find root currently being interrogated '''
-        return self._find_root
+        return self._dir.find_root
 
     @property
     def root(self):
         ''' Returns the directory path of the current item '''
-        if self._root:
-            return self._root
+        if self._dir.root:
+            return self._dir.root
         else:
-            return self._find_root
+            return self._dir.find_root
 
     @property
     def rel_dir(self):
         ''' Returns the directory relative to the find root for the current item '''
-        return self._rel_dir
+        return self._dir.rel_dir
 
     @property
     def name(self):
@@ -201,25 +492,120 @@ class PathParser:
     @property
     def full_path(self):
         ''' Returns the full path to the item '''
-        return self._full_path
+        if self._dir.root:
+            return os.path.join(self._dir.root, self._name)
+        else:
+            return self._name
 
     def __str__(self) -> str:
-        return self._full_path
+        return self.full_path
+
+    def prune(self):
+        '''
+        Requests that Finder does not descend into this item. This may be called by any matcher or
+        action while the item is handled, and it has no effect when the item is not a directory.
+        '''
+        self._flags |= __class__._PRUNED
+
+    @property
+    def pruned(self):
+        ''' Returns True iff prune() was called on this item '''
+        return bool(self._flags & __class__._PRUNED)
+
+    def quit(self):
+        '''
+        Requests that Finder stops walking once this item is handled. Actions after the one which
+        called this are not executed on the item.
+        '''
+        self._flags |= __class__._QUIT_REQUESTED
+
+    @property
+    def quit_requested(self):
+        ''' Returns True iff quit() was called on this item '''
+        return bool(self._flags & __class__._QUIT_REQUESTED)
 
     def _set_stat(self):
         if self._stat is None:
+            follow_links = self._dir.follow_links
             try:
-                self._stat = os.stat(self.full_path)
+                if self._dir_entry is not None:
+                    # Cached by DirEntry and free on Windows
+                    self._stat = self._dir_entry.stat(follow_symlinks=follow_links)
+                elif follow_links:
+                    self._stat = os.stat(self.full_path)
+                else:
+                    self._stat = os.lstat(self.full_path)
             except OSError:
-                pass
+                if follow_links:
+                    # Broken link - use the link itself
+                    try:
+                        self._stat = os.lstat(self.full_path)
+                    except OSError:
+                        pass
 
     @property
     def stat(self):
         self._set_stat()
         return self._stat
 
+    def _d_type_flags(self):
+        ''' Returns the bits of _flags which hold the type given by d_type of os.DirEntry '''
+        if self._dir_entry is None:
+            return 0
+        try:
+            # Ordered by how common each type is since this is called for every item
+            if self._dir_entry.is_file(follow_symlinks=False):
+                return __class__._D_TYPE_KNOWN | __class__._D_TYPE_FILE
+            elif self._dir_entry.is_dir(follow_symlinks=False):
+                return __class__._D_TYPE_KNOWN | __class__._D_TYPE_DIR
+            elif self._dir_entry.is_symlink():
+                return __class__._D_TYPE_KNOWN | __class__._D_TYPE_LINK
+            return __class__._D_TYPE_KNOWN
+        except OSError:
+            return 0
+
+    def _release_dir_entry(self):
+        '''
+        Drops os.DirEntry once the item was handled, keeping the type given by its d_type. An
+        item without os.DirEntry takes about half the memory.
+        '''
+        if self._dir_entry is not None:
+            self._flags |= self._d_type_flags()
+            self._dir_entry = None
+
+    def _get_d_type(self):
+        ''' Returns the FindType given by d_type without a call to stat or None when unknown '''
+        follow_links = self._dir.follow_links
+        if self._dir_entry is not None:
+            # Directories, files, and links can be determined from d_type without a call to stat
+            try:
+                if self._dir_entry.is_dir(follow_symlinks=follow_links):
+                    return FindType.DIRECTORY
+                elif self._dir_entry.is_file(follow_symlinks=follow_links):
+                    return FindType.FILE
+                elif not follow_links and self._dir_entry.is_symlink():
+                    return FindType.SYMBOLIC_LINK
+            except OSError:
+                pass
+            return None
+        flags = self._flags
+        if not flags & __class__._D_TYPE_KNOWN:
+            return None
+        elif flags & __class__._D_TYPE_LINK:
+            # The type of the target needs stat
+            return None if follow_links else FindType.SYMBOLIC_LINK
+        elif flags & __class__._D_TYPE_DIR:
+            return FindType.DIRECTORY
+        elif flags & __class__._D_TYPE_FILE:
+            return FindType.FILE
+        return None
+
     def get_type(self):
         ''' Returns the FindType of the item or None if it cannot be determined '''
+        if self._stat is None:
+            find_type = self._get_d_type()
+            if find_type is not None:
+                return find_type
         self._set_stat()
         if self._stat is None:
             return None
@@ -241,75 +627,242 @@ class PathParser:
         else:
             return None
 
+    def _is_empty_dir(self):
+        '''
+        Returns True when this directory has no items or None when it can't be read. Listing stops
+        at the first item, so the size of the directory doesn't matter.
+        '''
+        try:
+            with os.scandir(self.full_path) as it:
+                for _ in it:
+                    return False
+        except OSError:
+            return None
+        self._flags |= __class__._EMPTY_DIR
+        return True
+
     def get_rel_depth(self):
         '''
         Returns the depth of the item where 0 is the find_root itself, 1 is an item directly under
         find_root, etc.
         '''
-        if not self._root:
+        if self._dir.depth is not None:
+            return self._dir.depth
+        elif not self._dir.root:
             return 0
-        elif self._root == self._find_root:
+        elif self._dir.root == self._dir.find_root:
             return 1
-        depth = len(self._rel_dir.split(os.sep)) + 1
+        depth = len(self._dir.rel_dir.split(os.sep)) + 1
         return depth
 
-    def to_pydict(self):
-        ''' Returns the dictionary used in -py* actions '''
-        t = self.get_type()
-        d = {
-            "full_path": self.full_path,
-            "root": self.root,
-            "rel_dir": self.rel_dir,
-            "name": self.name,
-            "find_root": self.find_root,
-            "type": t.value if t else '-',
-            "depth": self.get_rel_depth()
-        }
+    @staticmethod
+    def get_pydict_data(keys:List[str]) -> PathData:
+        ''' Returns the PathData needed for the dictionary returned by to_pydict() to have keys '''
+        data = PathData.NAME
+        for key in keys:
+            if key.startswith('st_'):
+                data |= PathData.STAT
+            else:
+                data |= __class__.PYDICT_KEY_DATA.get(key, PathData.NAME)
+        return data
+
+    def _read_link(self):
+        ''' Returns the target of this item when it's a symbolic link or an empty string otherwise '''
+        # Skip the call to readlink when d_type shows that this isn't a link
+        flags = self._flags | self._d_type_flags()
+        if flags & __class__._D_TYPE_KNOWN and not flags & __class__._D_TYPE_LINK:
+            return ''
+        try:
+            return os.readlink(self.full_path)
+        except OSError:
+            return ''
+
+    # Values of stat keys when stat data can't be fetched
+    _STAT_DEFAULTS = {
+        'st_atime': 0.0,
+        'st_atime_ns': 0,
+        'st_blksize': 0,
+        'st_blocks': 0,
+        'st_ctime': 0.0,
+        'st_ctime_ns': 0,
+        'st_dev': 0,
+        'st_gid': 0,
+        'st_ino': 0,
+        'st_mode': 0,
+        'st_mtime': 0.0,
+        'st_mtime_ns': 0,
+        'st_nlink': 0,
+        'st_rdev': 0,
+        'st_size': 0
+    }
+
+    def _get_pydict_value(self, key):
+        ''' Computes the value of the given key of the dictionary returned by to_pydict() '''
+        if key == 'full_path':
+            return self.full_path
+        elif key == 'root':
+            return self.root
+        elif key == 'rel_dir':
+            return self.rel_dir
+        elif key == 'name':
+            return self.name
+        elif key == 'find_root':
+            return self.find_root
+        elif key == 'depth':
+            return self.get_rel_depth()
+        elif key == 'type':
+            t = self.get_type()
+            return t.value if t else '-'
+        elif key == 'link':
+            return self._read_link()
+
         self._set_stat()
-        if self._stat is not None:
-            d.update({k: getattr(self._stat, k) for k in dir(self._stat) if k.startswith('st_')})
-            d['atime'] = datetime.fromtimestamp(self._stat.st_atime)
-            d['ctime'] = datetime.fromtimestamp(self._stat.st_ctime)
-            d['mtime'] = datetime.fromtimestamp(self._stat.st_mtime)
-            d['mode_oct'] = oct(self._stat.st_mode)[2:]
-            d['perm_oct'] = oct(self._stat.st_mode & 0o777)[2:]
-            d['perm'] = stat.filemode(self._stat.st_mode)
-            d['group'] = _group_id_to_name(self._stat.st_gid)
-            try:
-                d['link'] = os.readlink(self.full_path)
-            except OSError:
-                d['link'] = ''
-            d['user'] = _user_id_to_name(self._stat.st_uid)
-        else:
-            d['st_atime'] = 0.0
-            d['st_atime_ns'] = 0
-            d['st_blksize'] = 0
-            d['st_blocks'] = 0
-            d['st_ctime'] = 0.0
-            d['st_ctime_ns'] = 0
-            d['st_dev'] = 0
-            d['st_gid'] = 0
-            d['st_ino'] = 0
-            d['st_mode'] = 0
-            d['st_mtime'] = 0.0
-            d['st_mtime_ns'] = 0
-            d['st_nlink'] = 0
-            d['st_rdev'] = 0
-            d['st_size'] = 0
-            d['atime'] = d['ctime'] = d['mtime'] = datetime.fromtimestamp(0)
-            d['mode_oct'] = '00000'
-            d['perm_oct'] = '000'
-            d['perm'] = '----------'
-            d['group'] = ''
-            d['link'] = ''
-            d['user'] = ''
-        return d
+        st = self._stat
+        if key.startswith('st_'):
+            if st is not None:
+                try:
+                    return getattr(st, key)
+                except AttributeError:
+                    pass
+            else:
+                return __class__._STAT_DEFAULTS[key]
+        elif key == 'mode_oct':
+            return oct(st.st_mode)[2:] if st is not None else '00000'
+        elif key == 'perm_oct':
+            return oct(st.st_mode & 0o777)[2:] if st is not None else '000'
+        elif key == 'perm':
+            return stat.filemode(st.st_mode) if st is not None else '----------'
+        elif key in ('atime', 'ctime', 'mtime'):
+            return datetime.fromtimestamp(getattr(st, 'st_' + key) if st is not None else 0)
+        elif key == 'group':
+            return _group_id_to_name(st.st_gid) if st is not None else ''
+        elif key == 'user':
+            return _user_id_to_name(st.st_uid) if st is not None else ''
+        raise KeyError(key)
+
+    def to_pymap(self):
+        '''
+        Returns a mapping with the same keys as the dictionary returned by to_pydict() where each
+        value is only computed once it is first accessed. This is meant for str.format_map().
+        '''
+        return _PyMap(self)
+
+    def to_pydict(self, data:PathData=PathData.ALL):
+        '''
+        Returns the dictionary used in -py* actions
+        Inputs: data - The PathData of the keys to include; calls to stat, readlink, and owner name
+                       lookups are only made when their keys are included (default: all keys)
+        '''
+        keys = ['full_path', 'root', 'rel_dir', 'name', 'find_root', 'depth']
+        if data & PathData.TYPE:
+            keys.append('type')
+        if data & PathData.LINK:
+            keys.append('link')
+        if data & PathData.STAT:
+            st = self.stat
+            if st is not None:
+                keys.extend([k for k in dir(st) if k.startswith('st_')])
+            else:
+                keys.extend(__class__._STAT_DEFAULTS.keys())
+            keys.extend(['mode_oct', 'perm_oct', 'perm'])
+        if data & PathData.TIMES:
+            keys.extend(['atime', 'ctime', 'mtime'])
+        if data & PathData.OWNER:
+            keys.extend(['group', 'user'])
+        return {key: self._get_pydict_value(key) for key in keys}
+
+class _PyMap(dict):
+    ''' The mapping returned by PathParser.to_pymap() '''
+    __slots__ = ('_path_parser',)
+
+    def __init__(self, path_parser):
+        super().__init__()
+        self._path_parser = path_parser
+
+    def __missing__(self, key):
+        value = self._path_parser._get_pydict_value(key)
+        self[key] = value
+        return value
+
+class StatColumns:
+    '''
+    A batch of items, normally those of one directory, along with columns of their stat data as
+    NumPy arrays. Stat data is only fetched and each column is only built once it is first used.
+    '''
+    def __init__(self, items:List[PathParser], executor:concurrent.futures.Executor=None):
+        '''
+        Inputs: items - The items of the batch
+                executor - The pool which matchers may use to work on items concurrently or None
+        '''
+        self.items = items
+        self.executor = executor
+        self._stats = None
+        self._columns = {}
+
+    def __len__(self):
+        return len(self.items)
+
+    def _get_stats(self):
+        if self._stats is None:
+            self._stats = [item.stat for item in self.items]
+        return self._stats
+
+    def column(self, name:str):
+        '''
+        Returns a NumPy array of the given os.stat_result attribute, such as st_mtime or st_mode,
+        for each item. The value is 0 for items without stat data (see has_stat).
+        '''
+        column = self._columns.get(name, None)
+        if column is None:
+            column = numpy.array(
+                [getattr(stat, name) if stat is not None else 0 for stat in self._get_stats()])
+            self._columns[name] = column
+        return column
+
+    @property
+    def has_stat(self):
+        ''' Returns a NumPy array which is True for each item whose stat data could be fetched '''
+        column = self._columns.get(None, None)
+        if column is None:
+            column = numpy.array([stat is not None for stat in self._get_stats()], dtype=bool)
+            self._columns[None] = column
+        return column
+
+    def select(self, mask) -> 'StatColumns':
+        ''' Returns the batch of the items where the given list or NumPy array of bool is True '''
+        selected = StatColumns(
+            [item for item, keep in zip(self.items, mask) if keep], self.executor)
+        if self._stats is not None:
+            selected._stats = [stat for stat, keep in zip(self._stats, mask) if keep]
+        selected._columns = {name: column[mask] for name, column in self._columns.items()}
+        return selected
+
+def _compare_values(value_comparison:ValueComparison, value, reference):
+    ''' Compares value to reference, where value may be a NumPy array '''
+    if value_comparison == ValueComparison.GREATER_THAN:
+        return (value > reference)
+    elif value_comparison == ValueComparison.LESS_THAN:
+        return (value < reference)
+    else:
+        return (value == reference)
+
+# The function of each ValueComparison for a single value
+_COMPARE_FUNCTIONS = {
+    ValueComparison.GREATER_THAN: operator.gt,
+    ValueComparison.LESS_THAN: operator.lt,
+    ValueComparison.EQUAL_TO: operator.eq
+}
 
 class Action:
     ''' Action base class - executes something based on the matched path '''
     def handle(self, path_parser):
         pass
 
+    @property
+    def needs(self) -> PathData:
+        ''' Returns the PathData that this action uses from each item '''
+        return PathData.NAME
+
 class PrintAction(Action):
     ''' Simply prints the full path of the item '''
     def __init__(self, end:str=None, file:io.IOBase=None, flush:bool=False):
@@ -329,9 +882,18 @@ class PyPrintAction(Action):
         self._end = end
         self._file = file
         self._flush = flush
+        try:
+            self._needs = PathParser.get_pydict_data(_format_keys(self._format))
+        except ValueError:
+            # Invalid format - error is raised once it is used
+            self._needs = PathData.ALL
+
+    @property
+    def needs(self) -> PathData:
+        return self._needs
 
     def handle(self, path_parser):
-        print_out = self._format.format(**path_parser.to_pydict())
+        print_out = self._format.format_map(path_parser.to_pymap())
         print(print_out, end=self._end, file=self._file, flush=self._flush)
 
 class PrintfAction(Action):
@@ -341,12 +903,42 @@ class PrintfAction(Action):
     # Group 2 is printf type (0 to 2 characters in length)
     printf_search_pattern = re.compile(r'%([^a-zA-Z%{[(]*)(([A-CT].)|([a-zD-SU-Z%{[(])|($))')
 
+    # Converts each printf type to the PathData needed for it; types starting with A, B, C, or T
+    # need PathData.STAT when followed by @ or PathData.TIMES otherwise
+    PRINTF_TYPE_DATA = {
+        'a': PathData.TIMES,
+        'c': PathData.TIMES,
+        't': PathData.TIMES,
+        'D': PathData.STAT,
+        'g': PathData.OWNER,
+        'G': PathData.STAT,
+        'i': PathData.STAT,
+        'l': PathData.LINK,
+        'm': PathData.STAT,
+        'M': PathData.STAT,
+        's': PathData.STAT,
+        'u': PathData.OWNER,
+        'U': PathData.STAT,
+        'y': PathData.TYPE
+    }
+
     def __init__(self, format:str, end:str=None, file:io.IOBase=None, flush:bool=False):
         super().__init__()
         self._format_base = bytes(format, "utf-8").decode("unicode_escape")
         self._end = end
         self._file = file
         self._flush = flush
+        self._needs = PathData.NAME
+        for matchobj in self.printf_search_pattern.finditer(self._format_base):
+            printf_type = matchobj.group(2)
+            if len(printf_type) == 2:
+                self._needs |= PathData.STAT if printf_type[1] == '@' else PathData.TIMES
+            else:
+                self._needs |= __class__.PRINTF_TYPE_DATA.get(printf_type, PathData.NAME)
+
+    @property
+    def needs(self) -> PathData:
+        return self._needs
 
     @staticmethod
     def _replace_fn(item_dict, matchobj):
@@ -357,11 +949,11 @@ class PrintfAction(Action):
         if printf_type == '%' or printf_type == '\n' or printf_type == '':
             return original_input
         elif printf_type == 'a':
-            value = '{atime:%a %b %d %H:%M:%S.%f %Y}'.format(**item_dict)
+            value = '{atime:%a %b %d %H:%M:%S.%f %Y}'.format_map(item_dict)
         elif printf_type == 'c':
-            value = '{ctime:%a %b %d %H:%M:%S.%f %Y}'.format(**item_dict)
+            value = '{ctime:%a %b %d %H:%M:%S.%f %Y}'.format_map(item_dict)
         elif printf_type == 't':
-            value = '{mtime:%a %b %d %H:%M:%S.%f %Y}'.format(**item_dict)
+            value = '{mtime:%a %b %d %H:%M:%S.%f %Y}'.format_map(item_dict)
         elif printf_type[0] in 'ABCT':
             t = printf_type[0]
             if t == 'A':
@@ -378,9 +970,9 @@ class PrintfAction(Action):
             if f == '@':
                 value = item_dict['st_' + time_str]
             elif f == '+':
-                value = f'{{{time_str}:%Y-%m-%d+%H:%M:%S.%f}}'.format(**item_dict)
+                value = f'{{{time_str}:%Y-%m-%d+%H:%M:%S.%f}}'.format_map(item_dict)
             else:
-                value = f'{{{time_str}:%{f}}}'.format(**item_dict)
+                value = f'{{{time_str}:%{f}}}'.format_map(item_dict)
         elif printf_type == 'd':
             value = item_dict['depth']
         elif printf_type == 'D':
@@ -447,7 +1039,7 @@ class PrintfAction(Action):
             return str(value)
 
     def handle(self, path_parser):
-        item_dict = path_parser.to_pydict()
+        item_dict = path_parser.to_pymap()
         replace_lambda = lambda matchobj : __class__._replace_fn(item_dict, matchobj)
         print_out = self.printf_search_pattern.sub(replace_lambda, self._format_base)
         print(print_out, end=self._end, file=self._file, flush=self._flush)
@@ -470,12 +1062,22 @@ class PyExecuteAction(Action):
     def __init__(self, command:List[str]):
         super().__init__()
         self._command = command
+        try:
+            self._needs = PathParser.get_pydict_data(
+                [key for element in command for key in _format_keys(element)])
+        except ValueError:
+            # Invalid format - error is raised once it is used
+            self._needs = PathData.ALL
+
+    @property
+    def needs(self) -> PathData:
+        return self._needs
 
     def handle(self, path_parser):
         command = list(self._command)
-        d = path_parser.to_pydict()
+        d = path_parser.to_pymap()
         for i in range(len(command)):
-            command[i] = command[i].format(**d)
+            command[i] = command[i].format_map(d)
         process = subprocess.Popen(command)
         process.communicate()
 
@@ -498,6 +1100,14 @@ class DeleteAction(Action):
                 except OSError as err:
                     print(str(err), file=sys.stderr)
 
+class QuitAction(Action):
+    ''' Stops the walk once the matched item is handled '''
+    def __init__(self):
+        super().__init__()
+
+    def handle(self, path_parser):
+        path_parser.quit()
+
 class Matcher:
     ''' Base matcher class which determines if an item is a match or not '''
     def __init__(self):
@@ -518,6 +1128,70 @@ class Matcher:
     def set_invert(self, invert):
         self._invert = invert
 
+    @property
+    def needs(self) -> PathData:
+        ''' Returns the PathData that this matcher uses from each item '''
+        return PathData.NAME
+
+    @property
+    def cost(self) -> MatchCost:
+        ''' Returns the relative cost of matching an item; derived from needs by default '''
+        needs = self.needs
+        if needs & (PathData.STAT | PathData.TIMES | PathData.OWNER | PathData.LINK):
+            return MatchCost.STAT
+        elif needs & PathData.TYPE:
+            return MatchCost.TYPE
+        else:
+            return MatchCost.NAME
+
+    @property
+    def pure(self) -> bool:
+        '''
+        Returns True iff matching has no side effects so that the optimizer may change when or
+        whether this matcher is evaluated. Matchers of this module are pure unless they override
+        this; other matchers are assumed to have side effects unless they override this.
+        '''
+        return (type(self).__module__ == __name__)
+
+    @property
+    def path_prefixes(self) -> Union[List[str],None]:
+        '''
+        Returns a list of strings where this matcher returns False, without side effects, for every
+        item whose full path starts with none of them, or None when items under any path may match.
+        Finder uses this to skip listing directories which can't contain a match.
+        '''
+        return None
+
+    def compile(self) -> Callable[[PathParser], bool]:
+        '''
+        Returns a function which takes a PathParser and returns the same result as is_match().
+        Finder calls this once before each walk; subclasses return functions specialized for their
+        settings which skip the overhead of is_match().
+        '''
+        return self.is_match
+
+    def compile_batch(self) -> Callable[[StatColumns], Any]:
+        '''
+        Returns a function which takes a StatColumns batch and returns the same result as
+        is_match() for each of its items, as a list or a NumPy array. Matchers of stat data
+        return functions which match the whole batch at once when NumPy is installed.
+        '''
+        match = self.compile()
+        return lambda batch: [match(item) for item in batch.items]
+
+    def match_batch(self, batch:StatColumns) -> List[bool]:
+        ''' Returns the result of is_match() for each item of the given batch '''
+        return [bool(result) for result in self.compile_batch()(batch)]
+
+    def _batch_result(self, batch, result):
+        '''
+        Returns the given NumPy array of results of a batch with invert applied. Same as
+        is_match(), items without stat data never match.
+        '''
+        if self._invert:
+            result = ~result
+        return result & batch.has_stat
+
 class StaticMatcher(Matcher):
     ''' Statically return True or False for every item '''
     def __init__(self, value:bool):
@@ -527,6 +1201,42 @@ class StaticMatcher(Matcher):
     def _is_match(self, path_parser):
         return self._value
 
+    @property
+    def cost(self) -> MatchCost:
+        return MatchCost.FREE
+
+    @property
+    def path_prefixes(self) -> Union[List[str],None]:
+        return None if self.is_match(None) else []
+
+    def compile(self) -> Callable[[PathParser], bool]:
+        value = self.is_match(None)
+        return lambda path_parser: value
+
+class PruneMatcher(Matcher):
+    ''' Always matches and prevents Finder from descending into the item '''
+    def __init__(self):
+        super().__init__()
+
+    def _is_match(self, path_parser):
+        path_parser.prune()
+        return True
+
+    @property
+    def cost(self) -> MatchCost:
+        return MatchCost.FREE
+
+    @property
+    def pure(self) -> bool:
+        return False
+
+    def compile(self) -> Callable[[PathParser], bool]:
+        result = not self._invert
+        def prune(path_parser):
+            path_parser.prune()
+            return result
+        return prune
+
 class DefaultMatcher(StaticMatcher):
     ''' The default matcher when none specified '''
     def __init__(self):
@@ -541,6 +1251,88 @@ class NameMatcher(Matcher):
     def _is_match(self, path_parser):
         return fnmatch.fnmatch(path_parser.name, self._pattern)
 
+    def compile(self) -> Callable[[PathParser], bool]:
+        match = _fnmatch_compile(self._pattern)
+        if self._invert:
+            return lambda path_parser: match(path_parser.name) is None
+        return lambda path_parser: match(path_parser.name) is not None
+
+class NameSetMatcher(Matcher):
+    '''
+    Matches when the name of the item matches any of the given patterns. Exact names and patterns
+    made of a literal prefix or suffix and * are looked up in hash sets, and all other patterns are
+    combined into one regular expression, so the cost barely grows with the number of patterns.
+    '''
+    def __init__(self, patterns:List[str]):
+        super().__init__()
+        self._patterns = list(patterns)
+        self._normcase = (os.path.normcase('A') != 'A')
+        self._exact = set()
+        # Map each prefix or suffix length to the set of prefixes or suffixes of that length
+        self._prefixes = {}
+        self._suffixes = {}
+        globs = []
+        for pattern in self._patterns:
+            if self._normcase:
+                pattern = os.path.normcase(pattern)
+            if not __class__._has_magic(pattern):
+                self._exact.add(pattern)
+            elif len(pattern) > 1 and pattern[0] == '*' and not __class__._has_magic(pattern[1:]):
+                suffix = pattern[1:]
+                self._suffixes.setdefault(len(suffix), set()).add(suffix)
+            elif len(pattern) > 1 and pattern[-1] == '*' and not __class__._has_magic(pattern[:-1]):
+                prefix = pattern[:-1]
+                self._prefixes.setdefault(len(prefix), set()).add(prefix)
+            else:
+                globs.append(fnmatch.translate(pattern))
+        if globs:
+            self._glob_regex = re.compile('|'.join(globs))
+        else:
+            self._glob_regex = None
+
+    @staticmethod
+    def _has_magic(pattern):
+        return any(c in pattern for c in '*?[')
+
+    @property
+    def patterns(self):
+        return self._patterns
+
+    def _is_match(self, path_parser):
+        name = path_parser.name
+        if self._normcase:
+            name = os.path.normcase(name)
+        return (
+            name in self._exact
+            or any(name[:length] in prefix_set for length, prefix_set in self._prefixes.items())
+            or any(name[-length:] in suffix_set for length, suffix_set in self._suffixes.items())
+            or (self._glob_regex is not None and self._glob_regex.match(name) is not None)
+        )
+
+    def compile(self) -> Callable[[PathParser], bool]:
+        exact = frozenset(self._exact)
+        prefixes = tuple((length, frozenset(s)) for length, s in self._prefixes.items())
+        suffixes = tuple((-length, frozenset(s)) for length, s in self._suffixes.items())
+        glob_match = self._glob_regex.match if self._glob_regex is not None else None
+        normcase = os.path.normcase if self._normcase else None
+        result = not self._invert
+        def match(path_parser):
+            name = path_parser.name
+            if normcase is not None:
+                name = normcase(name)
+            if name in exact:
+                return result
+            for end, prefix_set in prefixes:
+                if name[:end] in prefix_set:
+                    return result
+            for start, suffix_set in suffixes:
+                if name[start:] in suffix_set:
+                    return result
+            if glob_match is not None and glob_match(name) is not None:
+                return result
+            return not result
+        return match
+
 class FullPathMatcher(Matcher):
     ''' Matches against the full path of the item '''
     def __init__(self, pattern:str):
@@ -550,11 +1342,34 @@ class FullPathMatcher(Matcher):
     def _is_match(self, path_parser):
         return fnmatch.fnmatch(path_parser.full_path, self._pattern)
 
+    @property
+    def path_prefixes(self) -> Union[List[str],None]:
+        if self._invert or os.path.normcase('A') != 'A':
+            # Paths are compared case insensitively and with converted separators under Windows
+            return None
+        # The pattern is literal up to its first wildcard; * and ? also match path separators,
+        # so nothing after that narrows down which directories may contain a match
+        prefix = re.split(r'[*?[]', self._pattern, maxsplit=1)[0]
+        return [prefix] if prefix else None
+
+    def compile(self) -> Callable[[PathParser], bool]:
+        match = _fnmatch_compile(self._pattern)
+        if self._invert:
+            return lambda path_parser: match(path_parser.full_path) is None
+        return lambda path_parser: match(path_parser.full_path) is not None
+
 class RegexMatcher(Matcher):
     ''' Matches against the full path of the item using regex '''
-    def __init__(self, pattern:str, regex_type:RegexType):
+    def __init__(self, pattern:str, regex_type:RegexType, full_match:bool=False):
+        '''
+        Inputs: pattern - The regular expression of the given type
+                regex_type - The type of the regular expression
+                full_match - When True, the whole path must match, same as find; when False, the
+                             pattern may match anywhere in the path
+        '''
         super().__init__()
         self._regex_type = regex_type
+        self._full_match = full_match
 
         # Convert given regex type to Python re type
         if self._regex_type == RegexType.SED:
@@ -563,6 +1378,70 @@ class RegexMatcher(Matcher):
         # else: just use pattern as-is for re
 
         self._pattern = pattern
+        try:
+            self._regex = re.compile(pattern)
+        except re.error as err:
+            raise ValueError('Invalid regular expression \'{}\': {}'.format(pattern, err))
+        # Substrings which every match contains; checked before the regex is run
+        self._literals = __class__._get_required_literals(self._regex)
+
+    @staticmethod
+    def _get_required_literals(regex):
+        '''
+        Returns the literal substrings which must be in any string that the given compiled regex
+        matches, longest first. Only literals outside of alternations, repeats, and classes are
+        found, which covers the literal parts of most path patterns.
+        '''
+        if regex.flags & re.IGNORECASE:
+            return []
+        try:
+            parsed = sre_parse.parse(regex.pattern, regex.flags)
+        except Exception:
+            return []
+        literals = []
+        def add_literals(items):
+            run = []
+            for op, value in items:
+                if op == sre_parse.LITERAL:
+                    run.append(chr(value))
+                    continue
+                if run:
+                    literals.append(''.join(run))
+                    run = []
+                if op == sre_parse.SUBPATTERN and not value[-3] & re.IGNORECASE:
+                    # Groups must match as a whole; value is (group, add_flags, del_flags, pattern)
+                    add_literals(value[-1])
+            if run:
+                literals.append(''.join(run))
+        add_literals(parsed)
+        return sorted(literals, key=len, reverse=True)
+
+    @staticmethod
+    def _get_literal_prefix(regex, full_match):
+        '''
+        Returns the literal string which starts every string that the given compiled regex
+        matches, which is empty when the regex isn't anchored to the start of the string
+        '''
+        if regex.flags & (re.IGNORECASE | re.MULTILINE):
+            return ''
+        try:
+            items = list(sre_parse.parse(regex.pattern, regex.flags))
+        except Exception:
+            return ''
+        if not full_match:
+            # A search is only anchored when the pattern starts with ^ or \A
+            if not items or items[0] not in (
+                (sre_parse.AT, sre_parse.AT_BEGINNING),
+                (sre_parse.AT, sre_parse.AT_BEGINNING_STRING)
+            ):
+                return ''
+            items = items[1:]
+        prefix = []
+        for op, value in items:
+            if op != sre_parse.LITERAL:
+                break
+            prefix.append(chr(value))
+        return ''.join(prefix)
 
     @staticmethod
     def _pattern_escape_invert(pattern, chars):
@@ -576,11 +1455,35 @@ class RegexMatcher(Matcher):
         return pattern
 
     def _is_match(self, path_parser):
-        try:
-            m = re.search(self._pattern, path_parser.full_path)
-            return (m is not None)
-        except:
-            return False
+        path = path_parser.full_path
+        for literal in self._literals:
+            if literal not in path:
+                return False
+        if self._full_match:
+            return (self._regex.fullmatch(path) is not None)
+        else:
+            return (self._regex.search(path) is not None)
+
+    @property
+    def path_prefixes(self) -> Union[List[str],None]:
+        if self._invert:
+            return None
+        prefix = __class__._get_literal_prefix(self._regex, self._full_match)
+        return [prefix] if prefix else None
+
+    def compile(self) -> Callable[[PathParser], bool]:
+        match = self._regex.fullmatch if self._full_match else self._regex.search
+        literals = tuple(self._literals)
+        result = not self._invert
+        if not literals:
+            return lambda path_parser: (match(path_parser.full_path) is not None) == result
+        def match_path(path_parser):
+            path = path_parser.full_path
+            for literal in literals:
+                if literal not in path:
+                    return not result
+            return (match(path) is not None) == result
+        return match_path
 
 class TypeMatcher(Matcher):
     ''' Matches against the item's type '''
@@ -617,6 +1520,16 @@ class TypeMatcher(Matcher):
     def _is_match(self, path_parser):
         return (path_parser.get_type() in self._type_list)
 
+    def compile(self) -> Callable[[PathParser], bool]:
+        types = frozenset(self._type_list)
+        if self._invert:
+            return lambda path_parser: path_parser.get_type() not in types
+        return lambda path_parser: path_parser.get_type() in types
+
+    @property
+    def needs(self) -> PathData:
+        return PathData.TYPE
+
 class StatTimeIncrementMatcher(Matcher):
     ''' Matches against os.stat time relative to current time '''
     def __init__(
@@ -652,9 +1565,40 @@ class StatTimeIncrementMatcher(Matcher):
         else:
             return (t_inc == self._rel_inc)
 
+    def compile(self) -> Callable[[PathParser], bool]:
+        compare = _COMPARE_FUNCTIONS[self._value_comparison]
+        current_time_s = self._current_time_s
+        increment_s = self._increment_s
+        rel_inc = self._rel_inc
+        stat_name = self._stat_name
+        floor = math.floor
+        result = not self._invert
+        def match(path_parser):
+            stat = path_parser.stat
+            if stat is None:
+                # Couldn't get stat
+                return False
+            t_inc = floor((current_time_s - getattr(stat, stat_name)) / increment_s)
+            return compare(t_inc, rel_inc) == result
+        return match
+
+    def compile_batch(self) -> Callable[[StatColumns], Any]:
+        if not NUMPY_ENABLED:
+            return super().compile_batch()
+        def match_batch(batch):
+            t = self._current_time_s - batch.column(self._stat_name)
+            t_inc = numpy.floor(t / self._increment_s)
+            return self._batch_result(
+                batch, _compare_values(self._value_comparison, t_inc, self._rel_inc))
+        return match_batch
+
     def _get_stat_time(self, stat):
         return getattr(stat, self._stat_name)
 
+    @property
+    def needs(self) -> PathData:
+        return PathData.STAT
+
 class StatTimeMatcher(Matcher):
     ''' Matches against os.stat time to an absolute time '''
     def __init__(
@@ -687,35 +1631,137 @@ class StatTimeMatcher(Matcher):
         else:
             return (t == self._time_point)
 
+    def compile(self) -> Callable[[PathParser], bool]:
+        compare = _COMPARE_FUNCTIONS[self._value_comparison]
+        time_point = self._time_point
+        stat_name = self._stat_name
+        result = not self._invert
+        def match(path_parser):
+            stat = path_parser.stat
+            if stat is None:
+                # Couldn't get stat
+                return False
+            return compare(getattr(stat, stat_name), time_point) == result
+        return match
+
+    def compile_batch(self) -> Callable[[StatColumns], Any]:
+        if not NUMPY_ENABLED:
+            return super().compile_batch()
+        return lambda batch: self._batch_result(
+            batch,
+            _compare_values(
+                self._value_comparison, batch.column(self._stat_name), self._time_point)
+        )
+
     def _get_stat_time(self, stat):
         return getattr(stat, self._stat_name)
 
+    @property
+    def needs(self) -> PathData:
+        return PathData.STAT
+
 class EmptyMatcher(Matcher):
     ''' Matches when directory empty or file size is 0 bytes '''
     def __init__(self):
         super().__init__()
 
     def _is_match(self, path_parser):
-        if os.path.isfile(path_parser.full_path):
+        # The type is normally known from the walk without a call to stat
+        item_type = path_parser.get_type()
+        if item_type == FindType.FILE:
             stat = path_parser.stat
             if stat is None:
                 # Couldn't get stat
                 return None
             return (stat.st_size == 0)
-        elif os.path.isdir(path_parser.full_path):
-            return not bool(os.listdir(path_parser.full_path))
+        elif item_type == FindType.DIRECTORY:
+            return path_parser._is_empty_dir()
         else:
             return False
 
+    @property
+    def needs(self) -> PathData:
+        return PathData.TYPE | PathData.STAT
+
+    @property
+    def cost(self) -> MatchCost:
+        return MatchCost.LISTDIR
+
 class AccessMatcher(Matcher):
     ''' Matches against access type for current user (read, write, execute) '''
-    def __init__(self, access_type:int):
+    def __init__(self, access_type:int, from_stat:bool=False):
+        '''
+        Inputs: access_type - Any of os.R_OK, os.W_OK, and os.X_OK ORed together
+                from_stat - When False, os.access() is called for each item. When True, access is
+                            determined from the stat data of each item and the credentials of
+                            this process when possible, which ignores access control lists.
+        '''
         super().__init__()
         self._access_type = access_type
+        self._from_stat = from_stat
+
+    def set_from_stat(self, from_stat:bool) -> None:
+        ''' Sets whether access is determined from stat data; see __init__() '''
+        self._from_stat = from_stat
 
     def _is_match(self, path_parser):
+        if self._from_stat:
+            result = self._stat_access(path_parser)
+            if result is not None:
+                return result
         return os.access(path_parser.full_path, self._access_type)
 
+    def _stat_access(self, path_parser):
+        '''
+        Returns whether the item is accessible according to its permission bits, or None when
+        that isn't certain and os.access() must be used instead
+        '''
+        credentials = _get_credentials()
+        stat_result = path_parser.stat
+        if credentials is None or stat_result is None:
+            return None
+        euid, groups = credentials
+        mode = stat_result.st_mode
+        if euid == 0 or stat.S_ISLNK(mode):
+            # Root bypasses permission bits and os.access() follows links
+            return None
+        # R_OK, W_OK, and X_OK have the same values as the permission bits of each class
+        if stat_result.st_uid == euid:
+            bits = (mode >> 6) & 0o7
+        elif stat_result.st_gid in groups:
+            bits = (mode >> 3) & 0o7
+        else:
+            bits = mode & 0o7
+        if (bits & self._access_type) != self._access_type:
+            return False
+        # Mount flags only deny writing to items other than devices, FIFOs, and sockets, and only
+        # deny executing regular files
+        check_flags = 0
+        if self._access_type & os.W_OK and not (
+            stat.S_ISCHR(mode) or stat.S_ISBLK(mode) or stat.S_ISFIFO(mode) or stat.S_ISSOCK(mode)
+        ):
+            check_flags |= getattr(os, 'ST_RDONLY', 0)
+        if self._access_type & os.X_OK and stat.S_ISREG(mode):
+            check_flags |= getattr(os, 'ST_NOEXEC', 0)
+        if check_flags:
+            # Directories may be mount points, so their own mount is checked
+            if stat.S_ISDIR(mode) or not path_parser._dir.root:
+                dir_path = path_parser.full_path
+            else:
+                dir_path = path_parser._dir.root
+            if _get_mount_flags(dir_path) & check_flags:
+                # Rare enough that the exact answer is worth a call to os.access()
+                return None
+        return True
+
+    @property
+    def needs(self) -> PathData:
+        return PathData.STAT if self._from_stat else PathData.NAME
+
+    @property
+    def cost(self) -> MatchCost:
+        return MatchCost.STAT if self._from_stat else MatchCost.SYSCALL
+
 class GroupMatcher(Matcher):
     ''' Matches against group name or ID '''
     def __init__(self, gid_or_name:Union[int,str]):
@@ -739,6 +1785,15 @@ class GroupMatcher(Matcher):
             return None
         return (stat.st_gid == self._gid)
 
+    def compile_batch(self) -> Callable[[StatColumns], Any]:
+        if not NUMPY_ENABLED:
+            return super().compile_batch()
+        return lambda batch: self._batch_result(batch, batch.column('st_gid') == self._gid)
+
+    @property
+    def needs(self) -> PathData:
+        return PathData.STAT
+
 class UserMatcher(Matcher):
     ''' Matches against user name or ID '''
     def __init__(self, uid_or_name:Union[int,str]):
@@ -762,18 +1817,65 @@ class UserMatcher(Matcher):
             return None
         return (stat.st_uid == self._uid)
 
-class PermMatcher(Matcher):
-    ''' Matches against octal perm value '''
-    def __init__(self, perm:int, logic_operation:LogicOperation=None):
-        super().__init__()
-        self._perm = perm
-        self._logic_operation = logic_operation
+    def compile_batch(self) -> Callable[[StatColumns], Any]:
+        if not NUMPY_ENABLED:
+            return super().compile_batch()
+        return lambda batch: self._batch_result(batch, batch.column('st_uid') == self._uid)
 
-    def _is_match(self, path_parser):
-        stat = path_parser.stat
-        if stat is None:
-            # Couldn't get stat
-            return None
+    @property
+    def needs(self) -> PathData:
+        return PathData.STAT
+
+class NoGroupMatcher(Matcher):
+    ''' Matches when the group ID of the item has no name on the system '''
+    def __init__(self):
+        super().__init__()
+        # Windows will not support this module
+        if not GID_ENABLED:
+            raise ModuleNotFoundError('No module named \'grp\' - this OS may not support group matching')
+
+    def _is_match(self, path_parser):
+        stat = path_parser.stat
+        if stat is None:
+            # Couldn't get stat
+            return None
+        return (_group_names.get_name(stat.st_gid) is None)
+
+    @property
+    def needs(self) -> PathData:
+        return PathData.STAT
+
+class NoUserMatcher(Matcher):
+    ''' Matches when the user ID of the item has no name on the system '''
+    def __init__(self):
+        super().__init__()
+        # Windows will not support this module
+        if not UID_ENABLED:
+            raise ModuleNotFoundError('No module named \'pwd\' - this OS may not support user matching')
+
+    def _is_match(self, path_parser):
+        stat = path_parser.stat
+        if stat is None:
+            # Couldn't get stat
+            return None
+        return (_user_names.get_name(stat.st_uid) is None)
+
+    @property
+    def needs(self) -> PathData:
+        return PathData.STAT
+
+class PermMatcher(Matcher):
+    ''' Matches against octal perm value '''
+    def __init__(self, perm:int, logic_operation:LogicOperation=None):
+        super().__init__()
+        self._perm = perm
+        self._logic_operation = logic_operation
+
+    def _is_match(self, path_parser):
+        stat = path_parser.stat
+        if stat is None:
+            # Couldn't get stat
+            return None
         perm = (stat.st_mode & 0o777)
         if self._logic_operation is None:
             return (perm == self._perm)
@@ -784,8 +1886,131 @@ class PermMatcher(Matcher):
             # Any of perm bits set
             return ((perm | self._perm) != 0)
 
+    def compile_batch(self) -> Callable[[StatColumns], Any]:
+        if not NUMPY_ENABLED:
+            return super().compile_batch()
+        def match_batch(batch):
+            perm = (batch.column('st_mode') & 0o777)
+            if self._logic_operation is None:
+                result = (perm == self._perm)
+            elif self._logic_operation == LogicOperation.AND:
+                result = ((perm & self._perm) == self._perm)
+            else:
+                result = ((perm | self._perm) != 0)
+            return self._batch_result(batch, result)
+        return match_batch
+
+    @property
+    def needs(self) -> PathData:
+        return PathData.STAT
+
+class ContentMatcher(Matcher):
+    ''' Matches regular files which contain a literal string or a regex match '''
+    # Files of at least this many bytes are searched through mmap instead of read in full
+    MMAP_THRESHOLD = 1024 * 1024
+
+    def __init__(
+            self,
+            pattern:str,
+            regex_type:RegexType=None,
+            encoding:str='utf-8'
+    ):
+        '''
+        Inputs: pattern - The literal string to search for or the regular expression of the given
+                          type
+                regex_type - None to search for pattern as a literal string
+                encoding - The encoding of pattern in the files being searched
+        '''
+        super().__init__()
+        if regex_type == RegexType.SED:
+            pattern = RegexMatcher._pattern_escape_invert(pattern, '+?|{}()')
+        pattern_bytes = pattern.encode(encoding, 'surrogateescape')
+        if regex_type is None:
+            self._literal = pattern_bytes
+            self._regex = None
+        else:
+            self._literal = None
+            try:
+                self._regex = re.compile(pattern_bytes)
+            except re.error as err:
+                raise ValueError('Invalid regular expression \'{}\': {}'.format(pattern, err))
+
+    def _search(self, data):
+        ''' Returns True when data, a bytes-like object, contains the pattern '''
+        if self._literal is not None:
+            return (data.find(self._literal) >= 0)
+        return (self._regex.search(data) is not None)
+
+    def _search_file(self, path):
+        ''' Returns True when the file contains the pattern or None when it can't be read '''
+        try:
+            with open(path, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                if size < self.MMAP_THRESHOLD or size == 0:
+                    # Empty files can't be mapped
+                    return self._search(f.read())
+                # Searching stops at the first hit, so the rest of the file is never paged in
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    return self._search(data)
+        except (OSError, ValueError):
+            return None
+
+    def _is_match(self, path_parser):
+        if path_parser.get_type() != FindType.FILE:
+            return False
+        return self._search_file(path_parser.full_path)
+
+    def compile_batch(self) -> Callable[[StatColumns], Any]:
+        # Files of the batch are read concurrently by the pool of the walk, when there is one
+        match = self.compile()
+        def match_batch(batch):
+            if batch.executor is not None:
+                try:
+                    return list(batch.executor.map(match, batch.items))
+                except RuntimeError:
+                    # The walk is stopping and its pool was shut down
+                    pass
+            return [match(item) for item in batch.items]
+        return match_batch
+
+    @property
+    def needs(self) -> PathData:
+        return PathData.TYPE
+
+    @property
+    def cost(self) -> MatchCost:
+        return MatchCost.CONTENT
+
+class LinksMatcher(Matcher):
+    ''' Matches against the number of hard links to the item '''
+    def __init__(self, value_comparison:ValueComparison, links:int):
+        super().__init__()
+        self._value_comparison = value_comparison
+        self._links = links
+
+    def _is_match(self, path_parser):
+        stat = path_parser.stat
+        if stat is None:
+            # Couldn't get stat
+            return None
+        return _compare_values(self._value_comparison, stat.st_nlink, self._links)
+
+    def compile_batch(self) -> Callable[[StatColumns], Any]:
+        if not NUMPY_ENABLED:
+            return super().compile_batch()
+        return lambda batch: self._batch_result(
+            batch, _compare_values(self._value_comparison, batch.column('st_nlink'), self._links))
+
+    @property
+    def needs(self) -> PathData:
+        return PathData.STAT
+
 class GatedMatcher(Matcher):
     ''' Gates two matchers together using logical AND or OR '''
+    # Gates nested deeper than this are compiled into functions of their own since the parser
+    # limits how deeply parentheses may be nested within one expression
+    MAX_EXPRESSION_DEPTH = 16
+
     def __init__(self, left_matcher:Matcher, right_matcher:Matcher, operation:LogicOperation=LogicOperation.AND):
         super().__init__()
         self.operation = operation
@@ -804,6 +2029,353 @@ class GatedMatcher(Matcher):
                 or self.right_matcher.is_match(path_parser)
             )
 
+    @property
+    def needs(self) -> PathData:
+        def reduce_gate(gate, operand_needs):
+            needs = PathData.NAME
+            for value in operand_needs:
+                needs |= value
+            return needs
+        return self._reduce(lambda matcher: matcher.needs, reduce_gate)
+
+    @property
+    def cost(self) -> MatchCost:
+        return self._reduce(lambda matcher: matcher.cost, lambda gate, costs: max(costs))
+
+    @property
+    def pure(self) -> bool:
+        return self._reduce(lambda matcher: matcher.pure, lambda gate, pure: all(pure))
+
+    @property
+    def path_prefixes(self) -> Union[List[str],None]:
+        prefixes, _ = self._reduce(
+            lambda matcher: (matcher.path_prefixes, matcher.pure),
+            lambda gate, operands: (gate._gate_prefixes(operands), all(p for _, p in operands))
+        )
+        return prefixes
+
+    def _gate_prefixes(self, operands):
+        '''
+        Returns the path prefixes of this gate given a tuple (path_prefixes, pure) for each of its
+        operands
+        '''
+        if self._invert:
+            return None
+        if self.operation == LogicOperation.OR:
+            # Every operand must fail for the gate to fail
+            prefixes = []
+            for operand_prefixes, _ in operands:
+                if operand_prefixes is None:
+                    return None
+                prefixes.extend(operand_prefixes)
+            return sorted(set(prefixes))
+        # Any operand failing fails the gate, but only operands up to and including the first one
+        # with side effects are certain to be evaluated
+        prefixes = None
+        for operand_prefixes, pure in operands:
+            if operand_prefixes is not None:
+                if prefixes is None:
+                    prefixes = operand_prefixes
+                else:
+                    prefixes = self._intersect_prefixes(prefixes, operand_prefixes)
+            if not pure:
+                break
+        return prefixes
+
+    @staticmethod
+    def _intersect_prefixes(left, right):
+        ''' Returns the prefixes of the paths which start with both one of left and one of right '''
+        prefixes = set()
+        for left_prefix in left:
+            for right_prefix in right:
+                if left_prefix.startswith(right_prefix):
+                    prefixes.add(left_prefix)
+                elif right_prefix.startswith(left_prefix):
+                    prefixes.add(right_prefix)
+        return sorted(prefixes)
+
+    def _get_operands(self):
+        '''
+        Returns the operands of this gate with chains of the same operation flattened. This is
+        iterative since chains built by Finder.append_matcher() may be thousands of gates deep.
+        '''
+        operands = []
+        # Right operands are pushed first so that operands are popped in order
+        stack = [self.right_matcher, self.left_matcher]
+        while stack:
+            matcher = stack.pop()
+            if (
+                isinstance(matcher, GatedMatcher)
+                and not matcher._invert
+                and matcher.operation == self.operation
+            ):
+                stack.append(matcher.right_matcher)
+                stack.append(matcher.left_matcher)
+            else:
+                operands.append(matcher)
+        return operands
+
+    def _reduce(self, reduce_operand, reduce_gate):
+        '''
+        Computes a value for this gate from the bottom of the tree up, without recursion since
+        gates which alternate between AND and OR may be nested thousands deep.
+        Inputs: reduce_operand - Returns the value of a matcher which isn't a gate
+                reduce_gate - Returns the value of a gate given the values of its operands, in the
+                              order of _get_operands()
+        Returns: the value of this gate
+        '''
+        # Maps the id of each gate reduced so far to its value
+        values = {}
+        stack = [(self, self._get_operands())]
+        while stack:
+            gate, operands = stack[-1]
+            nested = [
+                matcher for matcher in operands
+                if isinstance(matcher, GatedMatcher) and id(matcher) not in values
+            ]
+            if nested:
+                stack.extend((matcher, matcher._get_operands()) for matcher in nested)
+                continue
+            stack.pop()
+            values[id(gate)] = reduce_gate(gate, [
+                values[id(matcher)] if isinstance(matcher, GatedMatcher)
+                else reduce_operand(matcher)
+                for matcher in operands
+            ])
+        return values[id(self)]
+
+    @staticmethod
+    def _merge_names(segment):
+        '''
+        Returns segment, a list of tuples (matcher, cost, pure), with all of its NameMatcher
+        operands replaced by one NameSetMatcher in place of the first one; only valid for the
+        operands of OR
+        '''
+        names = [
+            matcher for matcher, _, _ in segment
+            if type(matcher) is NameMatcher and not matcher._invert
+        ]
+        if len(names) < 2:
+            return segment
+        merged = NameSetMatcher([matcher._pattern for matcher in names])
+        merged_segment = []
+        for operand in segment:
+            matcher = operand[0]
+            if matcher is names[0]:
+                merged_segment.append((merged, merged.cost, merged.pure))
+            elif not any(matcher is name for name in names):
+                merged_segment.append(operand)
+        return merged_segment
+
+    def optimize(self, level:int) -> Matcher:
+        '''
+        Returns an equivalent matcher where pure operands are evaluated cheapest first. Operands
+        are never moved across one which isn't pure. Name tests which are ORed together are
+        merged into one NameSetMatcher. This matcher is not modified.
+        Inputs: level - 0: no change
+                        1: name and path tests are evaluated first and content tests last
+                        2: type tests are evaluated next
+                        3: all operands are ordered by cost
+        '''
+        if level <= 0:
+            return self
+        optimized, _, _ = self._reduce(
+            lambda matcher: (matcher, matcher.cost, matcher.pure),
+            lambda gate, operands: gate._arrange_operands(level, operands)
+        )
+        return optimized
+
+    def _arrange_operands(self, level, operands):
+        '''
+        Returns the optimized equivalent of this gate; see optimize(). The cost and purity of each
+        operand are passed along so that they aren't computed again for each gate above it.
+        Inputs: level - The optimization level
+                operands - A tuple (matcher, cost, pure) for each already optimized operand
+        Returns: a tuple (matcher, cost, pure) for the optimized gate
+        '''
+        if level == 1:
+            max_cost = MatchCost.NAME + 1
+        elif level == 2:
+            max_cost = MatchCost.TYPE + 1
+        else:
+            max_cost = MatchCost.CONTENT
+        # Files are only read once all other operands have passed
+        key = lambda operand: (
+            operand[1] if operand[1] >= MatchCost.CONTENT else min(operand[1], max_cost))
+        if self.operation == LogicOperation.OR:
+            arrange = lambda segment: sorted(self._merge_names(segment), key=key)
+        else:
+            arrange = lambda segment: sorted(segment, key=key)
+        arranged = []
+        segment = []
+        for operand in operands:
+            if operand[2]:
+                segment.append(operand)
+            else:
+                # Operands may only be reordered between those that have side effects
+                arranged.extend(arrange(segment))
+                arranged.append(operand)
+                segment = []
+        arranged.extend(arrange(segment))
+        cost = max(operand[1] for operand in arranged)
+        pure = all(operand[2] for operand in arranged)
+        if len(arranged) == 1:
+            # Every operand was merged into a new NameSetMatcher
+            arranged[0][0].set_invert(self._invert)
+            return (arranged[0][0], cost, pure)
+        optimized = arranged[0][0]
+        for matcher, _, _ in arranged[1:]:
+            optimized = GatedMatcher(optimized, matcher, self.operation)
+        optimized.set_invert(self._invert)
+        return (optimized, cost, pure)
+
+    def compile(self) -> Callable[[PathParser], bool]:
+        # The tree of gated matchers is generated as one boolean expression where each other
+        # matcher is called through its own compiled function. Deeply nested gates are split into
+        # functions called from the expression of their parent.
+        namespace = {}
+
+        def add_function(fn):
+            name = 'match{}'.format(len(namespace))
+            namespace[name] = fn
+            return name + '(path_parser)'
+
+        def compile_gate(gate, operands):
+            expression = gate._gate_expression(operands)
+            depth = 1 + max(depth for _, depth in operands)
+            if depth >= self.MAX_EXPRESSION_DEPTH:
+                return (add_function(eval('lambda path_parser: ' + expression, namespace)), 0)
+            return (expression, depth)
+
+        expression, _ = self._reduce(
+            lambda matcher: (add_function(matcher.compile()), 0), compile_gate)
+        return eval('lambda path_parser: ' + expression, namespace)
+
+    def _gate_expression(self, operands):
+        '''
+        Returns the Python expression of this gate given a tuple (expression, depth) for each of
+        its operands, where depth is 0 for a function call
+        '''
+        parts = [
+            expression if depth == 0 else '(' + expression + ')'
+            for expression, depth in operands
+        ]
+        operator = ' and ' if self.operation == LogicOperation.AND else ' or '
+        expression = operator.join(parts)
+        if self._invert:
+            expression = 'not (' + expression + ')'
+        return expression
+
+    def compile_batch(self) -> Callable[[StatColumns], Any]:
+        return self._reduce(
+            lambda matcher: matcher.compile_batch(),
+            lambda gate, operand_fns: gate._compile_gate_batch(operand_fns)
+        )
+
+    def _compile_gate_batch(self, operand_fns):
+        ''' Returns the batch function of this gate given the batch function of each operand '''
+        # Same short-circuiting as compile(): each operand only matches the items which are left
+        # undecided by the operands before it
+        is_and = (self.operation == LogicOperation.AND)
+        invert = self._invert
+        if not NUMPY_ENABLED:
+            def match_batch_list(batch):
+                result = [is_and] * len(batch)
+                undecided = list(range(len(batch)))
+                for operand_fn in operand_fns:
+                    if not undecided:
+                        break
+                    keep = [bool(matched) == is_and for matched in operand_fn(batch)]
+                    for index, keep_index in zip(undecided, keep):
+                        if not keep_index:
+                            result[index] = not is_and
+                    undecided = [index for index, keep_index in zip(undecided, keep) if keep_index]
+                    batch = batch.select(keep)
+                return [not value for value in result] if invert else result
+            return match_batch_list
+        def match_batch(batch):
+            result = numpy.full(len(batch), is_and, dtype=bool)
+            undecided = numpy.arange(len(batch))
+            for operand_fn in operand_fns:
+                if len(undecided) == 0:
+                    break
+                matched = numpy.asarray(operand_fn(batch), dtype=bool)
+                keep = matched if is_and else ~matched
+                result[undecided[~keep]] = not is_and
+                undecided = undecided[keep]
+                batch = batch.select(keep)
+            return ~result if invert else result
+        return match_batch
+
+class _ListingStack:
+    '''
+    The stack of directories left in a depth-first walk where directories are listed ahead by a
+    pool. Only the directories next in line are listed ahead, at most max_ahead at once: listings
+    further down the stack are cancelled, or dropped once done when fewer than min_running would
+    otherwise be running, and they are submitted again once they are next in line.
+    '''
+    def __init__(self, walk_dirs, submit, max_ahead:int, min_running:int):
+        '''
+        Inputs: walk_dirs - The (path, depth) of each directory to walk first
+                submit - Starts listing the given (path, depth) and returns its future, either a
+                         concurrent.futures.Future or an asyncio.Future
+                max_ahead - The maximum number of directories listed ahead at once
+                min_running - Done listings are dropped to keep this many listings running
+        '''
+        self._submit = submit
+        self._max_ahead = max_ahead
+        self._min_running = min_running
+        # Each element is a list of the (path, depth) and its future once submitted; the last one
+        # is walked next
+        self._stack = []
+        # The elements of the stack which were submitted
+        self._ahead = []
+        self.extend(walk_dirs)
+
+    def __bool__(self):
+        return bool(self._stack)
+
+    def extend(self, walk_dirs) -> None:
+        ''' Pushes the (path, depth) of each given directory, to be walked in the given order '''
+        self._stack.extend([[d, None] for d in reversed(walk_dirs)])
+
+    def _release(self, element):
+        element[1] = None
+        self._ahead = [e for e in self._ahead if e is not element]
+
+    def pop(self):
+        '''
+        Submits the directories next in line then pops the next one.
+        Returns: a tuple ((path, depth), future) for the next directory
+        '''
+        next_in_line = self._stack[-self._max_ahead:]
+        next_ids = {id(element) for element in next_in_line}
+        for element in self._ahead:
+            if id(element) not in next_ids and element[1].cancel():
+                self._release(element)
+        for element in reversed(next_in_line):
+            if element[1] is not None:
+                continue
+            if len(self._ahead) >= self._max_ahead:
+                done = [e for e in self._ahead if id(e) not in next_ids and e[1].done()]
+                if not done or len(self._ahead) - len(done) >= self._min_running:
+                    break
+                self._release(done[0])
+            element[1] = self._submit(element[0])
+            self._ahead.append(element)
+        element = self._stack.pop()
+        if element[1] is None:
+            element[1] = self._submit(element[0])
+        else:
+            self._ahead = [e for e in self._ahead if e is not element]
+        return (element[0], element[1])
+
+    def cancel(self) -> None:
+        ''' Cancels every listing ahead once the walk stops '''
+        for element in self._ahead:
+            element[1].cancel()
+        self._ahead = []
+
 class Finder:
     ''' Finder is capable of walking through paths and execute actions on matching paths '''
     def __init__(self) -> None:
@@ -815,6 +2387,35 @@ class Finder:
         self._invert = None
         self._actions = []
         self._verbose = False
+        self._workers = 1
+        self._ordered = True
+        self._processes = 1
+        self._order = WalkOrder.NAME
+        self._xdev = False
+        # Maps each root being walked to its st_dev when xdev is set
+        self._root_devs = {}
+        self._follow_links = FollowLinks.NEVER
+        # Maps each root being walked to a dict of (st_dev, st_ino) to path of each directory walked
+        # when symbolic links are followed
+        self._visited_dirs = {}
+        self._prefetch = 0
+        self._read_threads = 8
+        self._preload_ids = False
+        # The compiled function of the matcher; set when a walk starts
+        self._match_fn = None
+        # One of these starts the path of every match, or None when unknown; set when a walk starts
+        self._path_prefixes = None
+        # The compiled batch function of the matcher when directories are matched as one batch
+        self._match_batch = None
+        # Directories with fewer items than this are matched one item at a time
+        self._min_batch_size = MIN_BATCH_SIZE
+        self._optimization = 1
+        # The state of a walk, from here on, is only set on the copy made by _new_walk() so that
+        # walks of the same Finder may run at the same time
+        # The pool which fetches stat data of listed items while a walk is running
+        self._prefetch_executor = None
+        # The pool which reads files of each batch while a walk is running
+        self._read_executor = None
 
     def add_root(self, *root_dirs:Union[str,List[str]]) -> None:
         '''
@@ -917,12 +2518,226 @@ class Finder:
         '''
         self._matcher = matcher
 
-    def _handle_path(self, path_parser, actions, match_list):
-        if self._matcher.is_match(path_parser):
-            for action in actions:
-                action.handle(path_parser)
-            if match_list is not None:
-                match_list.append(path_parser)
+    def set_workers(self, workers:int) -> None:
+        '''
+        Sets the number of threads used to list directories and match their items. When set to 1
+        (default), the walk is done in the calling thread. Actions are always executed from the
+        thread which called execute() so their outputs never interleave.
+        '''
+        if workers < 1:
+            raise ValueError('Invalid number of workers: {}'.format(workers))
+        self._workers = workers
+
+    def set_processes(self, processes:int) -> None:
+        '''
+        Sets the number of worker processes used to list directories and match their items. When
+        greater than 1, each directory, however deep, is listed and matched by a worker process
+        which rebuilds this Finder from a copy of its matcher, so the matcher must be picklable.
+        Matches are sent back as each directory is done, and actions are executed in order by the
+        process which called execute() so their outputs never interleave.
+        '''
+        if processes < 1:
+            raise ValueError('Invalid number of processes: {}'.format(processes))
+        self._processes = processes
+
+    def set_prefetch(self, threads:int) -> None:
+        '''
+        Sets the number of threads used to fetch stat data of all items of each directory as soon
+        as it is listed (default: 0, disabled). Items are only prefetched when the matcher needs
+        stat data. This speeds up stat heavy queries on high latency file systems such as NFS.
+        '''
+        if threads < 0:
+            raise ValueError('Invalid number of prefetch threads: {}'.format(threads))
+        self._prefetch = threads
+
+    def set_read_threads(self, threads:int) -> None:
+        '''
+        Sets the number of threads used to read the files of each directory at once when the
+        matcher tests file contents (default: 8). The pool only lives while a walk is running.
+        '''
+        if threads < 1:
+            raise ValueError('Invalid number of read threads: {}'.format(threads))
+        self._read_threads = threads
+
+    def set_preload_ids(self, preload_ids:bool) -> None:
+        '''
+        When True, all user and group names known to the system are cached in one pass before the
+        walk starts instead of looking up each ID once it is first needed. User and group names
+        are always cached, including IDs which have no name.
+        '''
+        self._preload_ids = preload_ids
+
+    def set_optimization(self, level:int) -> None:
+        '''
+        Sets the optimization level of the matcher, from 0 to 3 (default: 1). Operands of AND and
+        OR which are pure are reordered so that cheaper tests are evaluated first; level 1 moves
+        name and path tests first and content tests last, level 2 also moves type tests ahead of
+        the rest, and level 3 orders all operands by cost. Results are the same at all levels.
+        '''
+        if level < 0 or level > 3:
+            raise ValueError('Invalid optimization level: {}'.format(level))
+        self._optimization = level
+
+    def set_ordered(self, ordered:bool) -> None:
+        '''
+        When True (default), items are handled in the same order as a single threaded walk. Set to
+        False in order to handle items as soon as any directory is listed by worker threads or
+        processes.
+        '''
+        self._ordered = ordered
+
+    def set_order(self, order:WalkOrder) -> None:
+        '''
+        Sets the order that the items of each directory are handled (default: WalkOrder.NAME).
+        WalkOrder.READDIR handles each item as soon as it is read from the directory without
+        sorting. WalkOrder.INODE may speed up stat heavy walks on spinning disks.
+        '''
+        self._order = order
+
+    def set_xdev(self, xdev:bool) -> None:
+        '''
+        When True, directories on a different file system than their root are not walked into.
+        '''
+        self._xdev = xdev
+
+    def set_follow_links(self, follow_links:FollowLinks) -> None:
+        '''
+        Sets when symbolic links are followed (default: FollowLinks.NEVER). When links are
+        followed, their type and stat data are of the file they point to, and each directory is
+        only walked once so that loops are never walked.
+        '''
+        self._follow_links = follow_links
+
+    def _plan(self, actions):
+        '''
+        Returns the PathData needed by the given actions which should be fetched for each match
+        before it is handled, or None when the actions only need data that is free to get
+        '''
+        data = PathData.NAME
+        for action in actions:
+            data |= action.needs
+        if self._needs_stat(data):
+            return data
+        return None
+
+    @staticmethod
+    def _needs_stat(data):
+        ''' Returns True iff the given PathData can't be determined without a call to stat '''
+        return bool(data & (PathData.STAT | PathData.TIMES | PathData.OWNER))
+
+    def _start_prefetch(self):
+        '''
+        Starts the prefetch pool when it is enabled and the matcher needs stat data.
+        Returns: True iff the pool was started by this call and must be stopped by the caller
+        '''
+        if (
+            self._prefetch > 0
+            and self._prefetch_executor is None
+            and self._needs_stat(self._matcher.needs)
+        ):
+            self._prefetch_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self._prefetch)
+            return True
+        return False
+
+    def _stop_prefetch(self, wait=True):
+        ''' Stops the prefetch pool, waiting for its calls to finish when wait is True '''
+        executor = self._prefetch_executor
+        self._prefetch_executor = None
+        executor.shutdown(wait=wait)
+
+    def _start_read_pool(self):
+        '''
+        Starts the pool which reads files of each batch when the matcher tests file contents.
+        Returns: True iff the pool was started by this call and must be stopped by the caller
+        '''
+        if (
+            self._read_threads > 1
+            and self._read_executor is None
+            and self._match_batch is not None
+            and self._matcher.cost >= MatchCost.CONTENT
+        ):
+            self._read_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self._read_threads)
+            return True
+        return False
+
+    def _stop_read_pool(self, wait=True):
+        '''
+        Stops the pool which reads files of each batch, waiting for its calls to finish when wait
+        is True
+        '''
+        executor = self._read_executor
+        self._read_executor = None
+        executor.shutdown(wait=wait)
+
+    def _new_walk(self):
+        '''
+        Returns a shallow copy of this Finder which holds the state of one walk, such as its
+        compiled matcher, its pools, and the directories it visited
+        '''
+        walk = copy.copy(self)
+        walk._root_devs = {}
+        walk._visited_dirs = {}
+        walk._prefetch_executor = None
+        walk._read_executor = None
+        return walk
+
+    def _compile_matcher(self):
+        ''' Compiles the matcher into the function used to match each item of the next walk '''
+        matcher = self._matcher
+        if isinstance(matcher, GatedMatcher):
+            matcher = matcher.optimize(self._optimization)
+        self._match_fn = matcher.compile()
+        self._path_prefixes = matcher.path_prefixes
+        # Batches change the order in which items are matched, so only pure matchers are used
+        if matcher.pure and matcher.cost >= MatchCost.CONTENT:
+            # Files of each directory are read concurrently
+            self._match_batch = matcher.compile_batch()
+            self._min_batch_size = 2
+        elif NUMPY_ENABLED and matcher.pure and self._needs_stat(matcher.needs):
+            self._match_batch = matcher.compile_batch()
+            self._min_batch_size = MIN_BATCH_SIZE
+        else:
+            self._match_batch = None
+
+    def _match_items(self, items, depth):
+        '''
+        Returns an iterable of the matches among the given items of one directory. Items of large
+        enough directories are matched as one batch when the matcher benefits from it, otherwise
+        items are matched lazily. The iterable must be consumed so that all items are listed.
+        '''
+        if depth < self._min_depth:
+            for _ in items:
+                pass
+            return []
+        if self._match_batch is None:
+            return (item for item in items if self._match_fn(item))
+        items = list(items)
+        if len(items) < self._min_batch_size:
+            return [item for item in items if self._match_fn(item)]
+        results = self._match_batch(StatColumns(items, self._read_executor))
+        return [item for item, result in zip(items, results) if result]
+
+    def _may_contain_matches(self, dir_path):
+        ''' Returns False when no item under the given directory can match '''
+        prefixes = self._path_prefixes
+        if prefixes is None:
+            return True
+        if not dir_path.endswith(os.sep) and not (os.altsep and dir_path.endswith(os.altsep)):
+            dir_path += os.sep
+        for prefix in prefixes:
+            if dir_path.startswith(prefix) or prefix.startswith(dir_path):
+                return True
+        return False
+
+    def _handle_path(self, path_parser, actions):
+        for action in actions:
+            action.handle(path_parser)
+            if path_parser.quit_requested:
+                break
+        # Only what d_type gave is kept from os.DirEntry of matches which are generated or kept
+        path_parser._release_dir_entry()
 
     def _is_depth_ok(self, depth):
         return (
@@ -930,23 +2745,360 @@ class Finder:
             and (self._max_depth is None or depth <= self._max_depth)
         )
 
-    def _is_path_depth_ok(self, root_dir, dir_path):
-        path_parser = PathParser(root_dir, (dir_path, ''))
-        depth = path_parser.get_rel_depth()
-        return self._is_depth_ok(depth)
+    def _is_dir(self, entry):
+        try:
+            return entry.is_dir(follow_symlinks=(self._follow_links == FollowLinks.ALWAYS))
+        except OSError:
+            return False
 
-    def execute(
-            self,
-            default_root:str=None,
-            default_action:Action=None,
-            return_list:bool=True
-    ) -> Union[List[PathParser],None]:
+    @staticmethod
+    def _inode(entry_and_is_dir):
+        try:
+            return entry_and_is_dir[0].inode()
+        except OSError:
+            return 0
+
+    def _scan_dir(self, dir_path):
         '''
-        Inputs: default_root:  The default root to use when no root was previously added
-                default_action:  The default action to use when no action was previously added.
-                return_list:  set to False in order to save on memory when return not needed
-        Returns: a list of PathParser when return_list is True or None when return_list is False
+        Generates a tuple (entry, is_dir) for each os.DirEntry in the given directory, in the
+        configured WalkOrder. Nothing is generated once the directory can't be read.
+        '''
+        try:
+            with os.scandir(dir_path) as it:
+                if self._order == WalkOrder.READDIR:
+                    # Stream entries while the directory is being read
+                    for entry in it:
+                        yield (entry, self._is_dir(entry))
+                    return
+                entries = [(entry, self._is_dir(entry)) for entry in it]
+        except OSError:
+            # Same as os.walk() - unreadable directories are skipped
+            return
+
+        if self._order == WalkOrder.INODE:
+            entries.sort(key=self._inode)
+            yield from entries
+        else:
+            # Directories then files, each sorted by name
+            entries.sort(key=lambda entry_and_is_dir: entry_and_is_dir[0].name)
+            yield from (e for e in entries if e[1])
+            yield from (e for e in entries if not e[1])
+
+    def _list_dir(self, root_dir, dir_path, depth, sub_dirs):
+        '''
+        Generates a PathParser for each item of the given directory.
+        Inputs: root_dir - The find root being walked
+                dir_path - The directory to list
+                depth - The depth of the items in this directory
+                sub_dirs - Each generated directory item which may be walked into is appended here
+        '''
+        root_dev = self._root_devs.get(root_dir, None)
+        follow_links = (self._follow_links == FollowLinks.ALWAYS)
+        dir_record = _DirRecord(root_dir, dir_path, depth, follow_links)
+        for entry, is_dir in self._scan_dir(dir_path):
+            path_parser = PathParser._from_dir_entry(dir_record, entry)
+            if is_dir:
+                if follow_links:
+                    # Loops are checked with stat data later on - fetch it now
+                    can_walk = (path_parser.stat is not None)
+                else:
+                    # Symbolic links to directories are not followed
+                    try:
+                        can_walk = not entry.is_symlink()
+                    except OSError:
+                        can_walk = True
+                if can_walk and (root_dev is None or self._get_dev(path_parser) == root_dev):
+                    sub_dirs.append(path_parser)
+            yield path_parser
+
+    def _list_dir_prefetched(self, root_dir, dir_path, depth, sub_dirs):
         '''
+        Same as _list_dir() except when the prefetch pool is running, the directory is listed in
+        full then stat data of its items is fetched concurrently before they are returned.
+        '''
+        items = self._list_dir(root_dir, dir_path, depth, sub_dirs)
+        executor = self._prefetch_executor
+        if executor is None or depth < self._min_depth:
+            return items
+        items = list(items)
+        if len(items) > 1:
+            try:
+                for _ in executor.map(PathParser._set_stat, items):
+                    pass
+            except RuntimeError:
+                # The walk is stopping - stat data is fetched once needed instead
+                pass
+        return items
+
+    @staticmethod
+    def _get_file_id(path_parser):
+        '''
+        Returns the tuple (st_dev, st_ino) of the given item, reusing its stat data when available,
+        or None when it can't be determined
+        '''
+        if _is_windows():
+            # st_dev and st_ino are always 0 in the stat result of os.DirEntry under Windows
+            try:
+                if path_parser._dir.follow_links:
+                    stat = os.stat(path_parser.full_path)
+                else:
+                    stat = os.lstat(path_parser.full_path)
+            except OSError:
+                return None
+        else:
+            stat = path_parser.stat
+            if stat is None:
+                return None
+        return (stat.st_dev, stat.st_ino)
+
+    @staticmethod
+    def _get_dev(path_parser):
+        ''' Returns the st_dev of the given item, reusing its stat data when available '''
+        file_id = Finder._get_file_id(path_parser)
+        return file_id[0] if file_id is not None else None
+
+    def _new_root(self, root_dir):
+        ''' Returns the PathParser for the given root '''
+        return PathParser(root_dir, depth=0, follow_links=(self._follow_links != FollowLinks.NEVER))
+
+    def _start_root(self, root_parser):
+        ''' Initializes the state of the walk under the given root '''
+        root_dir = root_parser.full_path
+        dev = self._get_dev(root_parser) if self._xdev else None
+        if dev is not None:
+            self._root_devs[root_dir] = dev
+        else:
+            self._root_devs.pop(root_dir, None)
+        if self._follow_links == FollowLinks.ALWAYS:
+            # The root itself is added once it is walked
+            self._visited_dirs[root_dir] = {}
+        else:
+            self._visited_dirs.pop(root_dir, None)
+
+    def _is_new_dir(self, path_parser):
+        '''
+        Returns False when the given directory was already walked under its root. Always returns
+        True when symbolic links are not followed since loops are then impossible.
+        '''
+        visited = self._visited_dirs.get(path_parser.find_root, None)
+        if visited is None:
+            return True
+        file_id = self._get_file_id(path_parser)
+        if file_id is None:
+            return True
+        visited_path = visited.get(file_id, None)
+        if visited_path is not None:
+            if self._verbose:
+                print(
+                    'File system loop detected; \'{}\' was already walked as \'{}\''.format(
+                        path_parser.full_path, visited_path),
+                    file=sys.stderr
+                )
+            return False
+        visited[file_id] = path_parser.full_path
+        return True
+
+    def _match_dir(self, root_dir, dir_path, depth, plan=None):
+        '''
+        Lists the given directory and matches each of its items. This is executed by worker threads.
+        Inputs: plan - The PathData returned by _plan() which is fetched for each match so that
+                       it isn't fetched while the match is handled
+        Returns: a tuple (matches, sub_dirs) where sub_dirs is the list of directory items which may
+                 be walked into
+        '''
+        sub_dirs = []
+        items = self._list_dir_prefetched(root_dir, dir_path, depth, sub_dirs)
+        matches = list(self._match_items(items, depth))
+        if plan is not None:
+            for match in matches:
+                match.stat
+        return (matches, sub_dirs)
+
+    def _walk_dirs(self, sub_dirs, depth):
+        '''
+        Returns the (path, depth) of each directory in sub_dirs that should be walked into where
+        depth is the depth of the directories in sub_dirs.
+        Directories are never listed when their items would be deeper than the max depth, when
+        they were pruned by the time all items of their parent were handled, when the paths of
+        their items can't match, or when they were already walked through another symbolic link.
+        '''
+        if self._max_depth is not None and depth + 1 > self._max_depth:
+            # Items under these directories would be too deep
+            return []
+        return [
+            (sub_dir.full_path, depth)
+            for sub_dir in sub_dirs
+            if (
+                not sub_dir.pruned
+                and not sub_dir._flags & PathParser._EMPTY_DIR
+                and self._may_contain_matches(sub_dir.full_path)
+                and self._is_new_dir(sub_dir)
+            )
+        ]
+
+    def _walk(self, root_dir, actions):
+        '''
+        Generates each matching PathParser under root_dir, including root_dir itself, after the
+        given actions were executed on it. Items are generated in the same order as os.walk(): all
+        items of a directory, then each sub directory in turn. A PathParser may be pruned until the
+        next item is requested.
+        Inputs: root_dir - The find root to walk
+                actions - The actions to execute on each match
+        '''
+        self._compile_matcher()
+        root_parser = self._new_root(root_dir)
+        if self._is_depth_ok(0) and self._match_fn(root_parser):
+            self._handle_path(root_parser, actions)
+            yield root_parser
+        if root_parser.pruned or root_parser.get_type() != FindType.DIRECTORY:
+            return
+
+        self._start_root(root_parser)
+        walk_dirs = self._walk_dirs([root_parser], 0)
+        prefetch_started = self._start_prefetch()
+        read_pool_started = self._start_read_pool()
+        try:
+            if self._processes > 1:
+                yield from self._walk_processes(root_dir, walk_dirs, actions)
+            elif self._workers > 1:
+                yield from self._walk_parallel(root_dir, walk_dirs, actions)
+            else:
+                yield from self._walk_from(root_dir, walk_dirs, actions)
+        finally:
+            if read_pool_started:
+                self._stop_read_pool()
+            if prefetch_started:
+                self._stop_prefetch()
+
+    def _walk_from(self, root_dir, walk_dirs, actions):
+        '''
+        Same as _walk() except only the directories under each (path, depth) in walk_dirs are
+        walked.
+        '''
+        # Each element is a directory path and the depth of that directory; pushed in reverse so
+        # that the first directory is walked first
+        dir_stack = list(reversed(walk_dirs))
+        while dir_stack:
+            dir_path, dir_depth = dir_stack.pop()
+            depth = dir_depth + 1
+            sub_dirs = []
+            items = self._list_dir_prefetched(root_dir, dir_path, depth, sub_dirs)
+            for item in self._match_items(items, depth):
+                self._handle_path(item, actions)
+                yield item
+            dir_stack.extend(reversed(self._walk_dirs(sub_dirs, depth)))
+
+    def _walk_parallel(self, root_dir, walk_dirs, actions):
+        '''
+        Same as _walk_from() except directories are listed and matched by a pool of worker threads.
+        Sub directories are queued once all matches of their parent directory were handled so that
+        pruning is honored.
+        '''
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self._workers)
+        plan = self._plan(actions)
+        yield from self._walk_pool(
+            executor,
+            self._workers,
+            lambda dir_path, depth: executor.submit(
+                self._match_dir, root_dir, dir_path, depth, plan),
+            walk_dirs,
+            actions
+        )
+
+    def _describe(self):
+        '''
+        Returns a picklable dict used to rebuild this Finder in another process in order to list
+        and match directories of the current walk
+        '''
+        return {
+            # Tells each worker process when it must rebuild its Finder
+            'walk_id': (os.getpid(), id(self), time.time()),
+            'matcher': self._matcher,
+            'min_depth': self._min_depth,
+            'max_depth': self._max_depth,
+            'order': self._order,
+            'root_devs': self._root_devs,
+            'follow_links': self._follow_links,
+            'prefetch': self._prefetch,
+            'read_threads': self._read_threads,
+            'optimization': self._optimization,
+            'preload_ids': self._preload_ids
+        }
+
+    def _walk_processes(self, root_dir, walk_dirs, actions):
+        '''
+        Same as _walk_parallel() except directories are listed and matched by a pool of worker
+        processes, each directory on its own so that deep or skewed trees are spread over all of
+        them. Matches are sent back as each directory is done, and actions are executed by this
+        process in order.
+        '''
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=self._processes)
+        description = self._describe()
+        plan = self._plan(actions)
+        yield from self._walk_pool(
+            executor,
+            self._processes,
+            lambda dir_path, depth: executor.submit(
+                _match_dir_in_process, description, root_dir, dir_path, depth, plan),
+            walk_dirs,
+            actions
+        )
+
+    def _walk_pool(self, executor, workers, submit, walk_dirs, actions):
+        '''
+        Walks the directories under each (path, depth) in walk_dirs, where each directory is listed
+        and matched in the given pool, then shuts the pool down.
+        Inputs: executor - The pool of workers
+                workers - The number of workers of the pool
+                submit - Submits the directory at the given path, whose items are at the given
+                         depth, to the pool; returns a future of the result of _match_dir()
+                walk_dirs - The (path, depth) of each directory to walk
+                actions - The actions to execute on each match
+        '''
+        def handle(matches):
+            for match in matches:
+                self._handle_path(match, actions)
+                yield match
+
+        # Maps each queued future to the depth of the items it lists when unordered
+        pending = {}
+        try:
+            if self._ordered:
+                # Depth-first over directories, same as the single threaded walk
+                listing = _ListingStack(
+                    walk_dirs,
+                    lambda d: submit(d[0], d[1] + 1),
+                    workers * LISTING_AHEAD_PER_WORKER,
+                    workers
+                )
+                try:
+                    while listing:
+                        (_, dir_depth), future = listing.pop()
+                        matches, sub_dirs = future.result()
+                        yield from handle(matches)
+                        listing.extend(self._walk_dirs(sub_dirs, dir_depth + 1))
+                finally:
+                    listing.cancel()
+            else:
+                # Handle directories as soon as they complete
+                for dir_path, dir_depth in walk_dirs:
+                    pending[submit(dir_path, dir_depth + 1)] = dir_depth + 1
+                while pending:
+                    done, _ = concurrent.futures.wait(
+                        pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in done:
+                        matches, sub_dirs = future.result()
+                        depth = pending.pop(future)
+                        yield from handle(matches)
+                        for dir_path, _ in self._walk_dirs(sub_dirs, depth):
+                            pending[submit(dir_path, depth + 1)] = depth + 1
+        finally:
+            # The walk may have been abandoned - don't start anything that is still queued
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+    def _get_roots_and_actions(self, default_root, default_action):
         root_dirs = self._root_dirs
         if not root_dirs and default_root is not None:
             # Default to "."
@@ -958,28 +3110,210 @@ class Finder:
         if not actions and default_action is not None:
             # Default to print
             actions = [default_action()]
+        return (root_dirs, actions)
 
-        # If return_list is set to true, set match_list so it can be filled
-        # Otherwise, it will remain None and None will be returned
-        match_list = None
-        if return_list:
-            match_list = []
-
+    @staticmethod
+    def _is_last_result(match, count, max_results):
+        return match.quit_requested or (max_results is not None and count >= max_results)
+
+    def _iter(self, default_root, default_action, max_results):
+        if max_results is not None and max_results <= 0:
+            return
+        root_dirs, actions = self._get_roots_and_actions(default_root, default_action)
+        if self._preload_ids:
+            _preload_id_names()
+        count = 0
+        walker = self._new_walk()
         for root_dir in root_dirs:
-            # Check just the root first
-            if self._is_depth_ok(0):
-                self._handle_path(PathParser(root_dir), actions, match_list)
+            walk = walker._walk(root_dir, actions)
+            try:
+                for match in walk:
+                    yield match
+                    count += 1
+                    if self._is_last_result(match, count, max_results):
+                        # Nothing else is listed
+                        return
+            finally:
+                walk.close()
+
+    def iter(
+            self,
+            default_root:str=None,
+            default_action:Action=None,
+            max_results:int=None
+    ) -> Iterator[PathParser]:
+        '''
+        Generates each matching PathParser as soon as it is found, after all actions were executed
+        on it. The walk only progresses as items are requested, and it may be abandoned at any time
+        by closing or dereferencing the returned generator.
+        Inputs: default_root:  The default root to use when no root was previously added
+                default_action:  The default action to use when no action was previously added.
+                max_results:  When set, the walk stops once this many items matched
+        '''
+        return self._iter(default_root, default_action, max_results)
 
-            if os.path.isdir(root_dir):
-                # Walk through each
-                for root, dirs, files in os.walk(root_dir, followlinks=False):
-                    dirs.sort()
-                    files.sort()
-                    if self._is_path_depth_ok(root_dir, root):
-                        for entity in dirs + files:
-                            self._handle_path(PathParser(root_dir, (root, entity)), actions, match_list)
+    def __iter__(self) -> Iterator[PathParser]:
+        return self.iter()
 
-        return match_list
+    def execute(
+            self,
+            default_root:str=None,
+            default_action:Action=None,
+            return_list:bool=True,
+            max_results:int=None
+    ) -> Union[List[PathParser],None]:
+        '''
+        Inputs: default_root:  The default root to use when no root was previously added
+                default_action:  The default action to use when no action was previously added.
+                return_list:  set to False in order to save on memory when return not needed
+                max_results:  When set, the walk stops once this many items matched
+        Returns: a list of PathParser when return_list is True or None when return_list is False
+        '''
+        matches = self._iter(default_root, default_action, max_results)
+        if return_list:
+            return list(matches)
+        else:
+            for _ in matches:
+                pass
+            return None
+
+    async def aiter(
+            self,
+            default_root:str=None,
+            default_action:Action=None,
+            max_outstanding:int=None,
+            max_results:int=None
+    ) -> AsyncIterator[PathParser]:
+        '''
+        Same as iter() except this is an asynchronous generator for use with asyncio. Directory
+        listing, matching, and actions are executed in the event loop's default executor so that
+        the event loop is never blocked. Cancelling the task which iterates stops the walk.
+        Inputs: default_root:  The default root to use when no root was previously added
+                default_action:  The default action to use when no action was previously added.
+                max_outstanding:  The maximum number of directories listed ahead at once for this
+                                  walk, next in line first (default: the number of workers);
+                                  actions are executed one at a time besides these
+                max_results:  When set, the walk stops once this many items matched
+        '''
+        if max_results is not None and max_results <= 0:
+            return
+        # get_running_loop() is only available from Python 3.7
+        loop = getattr(asyncio, 'get_running_loop', asyncio.get_event_loop)()
+        max_outstanding = max_outstanding or self._workers
+
+        async def run(fn, *args):
+            # Calls other than listings are awaited one at a time, so they never wait behind the
+            # directories being listed ahead
+            return await loop.run_in_executor(None, fn, *args)
+
+        root_dirs, actions = self._get_roots_and_actions(default_root, default_action)
+        walk = self._new_walk()
+        plan = walk._plan(actions)
+        walk._compile_matcher()
+        if walk._preload_ids:
+            await run(_preload_id_names)
+        count = 0
+        prefetch_started = walk._start_prefetch()
+        read_pool_started = walk._start_read_pool()
+        try:
+            for root_dir in root_dirs:
+                root_parser = walk._new_root(root_dir)
+                if walk._is_depth_ok(0) and await run(walk._match_fn, root_parser):
+                    await run(walk._handle_path, root_parser, actions)
+                    yield root_parser
+                    count += 1
+                    if self._is_last_result(root_parser, count, max_results):
+                        return
+                if root_parser.pruned or await run(root_parser.get_type) != FindType.DIRECTORY:
+                    continue
+                await run(walk._start_root, root_parser)
+
+                # Depth-first over directories, same as iter(); the directories next in line are
+                # listed ahead while matches are being handled
+                listing = _ListingStack(
+                    walk._walk_dirs([root_parser], 0),
+                    lambda d, root_dir=root_dir: asyncio.ensure_future(
+                        run(walk._match_dir, root_dir, d[0], d[1] + 1, plan)),
+                    max_outstanding,
+                    max_outstanding
+                )
+                try:
+                    while listing:
+                        (_, dir_depth), task = listing.pop()
+                        matches, sub_dirs = await task
+                        for match in matches:
+                            await run(walk._handle_path, match, actions)
+                            yield match
+                            count += 1
+                            if self._is_last_result(match, count, max_results):
+                                return
+                        listing.extend(walk._walk_dirs(sub_dirs, dir_depth + 1))
+                finally:
+                    # The walk may have been cancelled or abandoned
+                    listing.cancel()
+        finally:
+            # Shutting down must not block the event loop; calls still running in the pools finish
+            # on their own
+            if read_pool_started:
+                walk._stop_read_pool(wait=False)
+            if prefetch_started:
+                walk._stop_prefetch(wait=False)
+
+    def __aiter__(self) -> AsyncIterator[PathParser]:
+        return self.aiter()
+
+    async def aexecute(
+            self,
+            default_root:str=None,
+            default_action:Action=None,
+            return_list:bool=True,
+            max_outstanding:int=None,
+            max_results:int=None
+    ) -> Union[List[PathParser],None]:
+        '''
+        Same as execute() except this is a coroutine for use with asyncio (see aiter()).
+        '''
+        match_list = []
+        async for match in self.aiter(default_root, default_action, max_outstanding, max_results):
+            if return_list:
+                match_list.append(match)
+        return match_list if return_list else None
+
+# The walk ID and Finder rebuilt by this worker process for the walk it currently serves
+_process_walk = (None, None)
+
+def _match_dir_in_process(description, root_dir, dir_path, depth, plan):
+    '''
+    Lists and matches one directory with a Finder rebuilt from the given description, which is
+    kept for following directories of the same walk. This is executed by worker processes.
+    Returns: same as Finder._match_dir()
+    '''
+    global _process_walk
+    walk_id, finder = _process_walk
+    if walk_id != description['walk_id']:
+        if finder is not None:
+            if finder._read_executor is not None:
+                finder._stop_read_pool()
+            if finder._prefetch_executor is not None:
+                finder._stop_prefetch()
+        finder = Finder()
+        finder.set_matcher(description['matcher'])
+        finder.set_optimization(description['optimization'])
+        finder._compile_matcher()
+        finder.set_min_depth(description['min_depth'])
+        finder.set_max_depth(description['max_depth'])
+        finder.set_order(description['order'])
+        finder._root_devs = description['root_devs']
+        finder.set_follow_links(description['follow_links'])
+        finder.set_prefetch(description['prefetch'])
+        finder.set_read_threads(description['read_threads'])
+        if description['preload_ids']:
+            _preload_id_names()
+        # Pools live as long as the walk is served by this process
+        finder._start_prefetch()
+        finder._start_read_pool()
+        _process_walk = (description['walk_id'], finder)
+    return finder._match_dir(root_dir, dir_path, depth, plan)
 
 class Options(Enum):
     ''' Contains all command line option types '''
@@ -995,17 +3329,22 @@ class Options(Enum):
     NAME = enum.auto()
     FULL_PATH = enum.auto()
     REGEX = enum.auto()
+    FULL_REGEX = enum.auto()
     AMIN = enum.auto()
     ANEWER = enum.auto()
     ATIME = enum.auto()
     CMIN = enum.auto()
     CNEWER = enum.auto()
     CTIME = enum.auto()
+    CONTAINS = enum.auto()
+    GREP = enum.auto()
     EMPTY = enum.auto()
     EXECUTABLE = enum.auto()
     FALSE = enum.auto()
+    PRUNE = enum.auto()
     GID = enum.auto()
     GROUP = enum.auto()
+    LINKS = enum.auto()
     MMIN = enum.auto()
     NEWER = enum.auto()
     NEWERXY = enum.auto()
@@ -1031,7 +3370,20 @@ class Options(Enum):
     PYPRINT0 = enum.auto()
     FPYPRINT0 = enum.auto()
     DELETE = enum.auto()
+    QUIT = enum.auto()
     VERBOSE = enum.auto()
+    WORKERS = enum.auto()
+    PROCESSES = enum.auto()
+    PREFETCH = enum.auto()
+    PRELOAD_IDS = enum.auto()
+    FAST_ACCESS = enum.auto()
+    OPTIMIZE = enum.auto()
+    UNORDERED = enum.auto()
+    ORDER = enum.auto()
+    XDEV = enum.auto()
+    NEVER_FOLLOW = enum.auto()
+    FOLLOW = enum.auto()
+    FOLLOW_ROOTS = enum.auto()
 
 class FinderArgParser:
     ''' This class parses find arguments into a Finder object '''
@@ -1056,17 +3408,22 @@ class FinderArgParser:
         '-wholename': Options.FULL_PATH,
         '-path': Options.FULL_PATH,
         '-regex': Options.REGEX,
+        '-fullregex': Options.FULL_REGEX,
         '-amin': Options.AMIN,
         '-anewer': Options.ANEWER,
         '-atime': Options.ATIME,
         '-cmin': Options.CMIN,
         '-cnewer': Options.CNEWER,
         '-ctime': Options.CTIME,
+        '-contains': Options.CONTAINS,
+        '-grep': Options.GREP,
         '-empty': Options.EMPTY,
         '-executable': Options.EXECUTABLE,
         '-false': Options.FALSE,
+        '-prune': Options.PRUNE,
         '-gid': Options.GID,
         '-group': Options.GROUP,
+        '-links': Options.LINKS,
         '-mmin': Options.MMIN,
         '-newer': Options.NEWER,
         '-neweraa': Options.NEWERXY,
@@ -1083,7 +3440,7 @@ class FinderArgParser:
         '-newermt': Options.NEWERXY,
         '-mtime': Options.MTIME,
         '-nogroup': Options.NOGROUP,
-        '-nouser': Options.NOGROUP,
+        '-nouser': Options.NOUSER,
         '-perm': Options.PERM,
         '-readable': Options.READABLE,
         '-true': Options.TRUE,
@@ -1103,9 +3460,30 @@ class FinderArgParser:
         '-pyprint0': Options.PYPRINT0,
         '-fpyprint0': Options.FPYPRINT0,
         '-delete': Options.DELETE,
-        '-verbose': Options.VERBOSE
+        '-quit': Options.QUIT,
+        '-verbose': Options.VERBOSE,
+        '-j': Options.WORKERS,
+        '-procs': Options.PROCESSES,
+        '-prefetch': Options.PREFETCH,
+        '-preloadids': Options.PRELOAD_IDS,
+        '-fastaccess': Options.FAST_ACCESS,
+        '-unordered': Options.UNORDERED,
+        '-order': Options.ORDER,
+        '-xdev': Options.XDEV,
+        '-mount': Options.XDEV,
+        '-P': Options.NEVER_FOLLOW,
+        '-L': Options.FOLLOW,
+        '-follow': Options.FOLLOW,
+        '-H': Options.FOLLOW_ROOTS,
+        '-O0': Options.OPTIMIZE,
+        '-O1': Options.OPTIMIZE,
+        '-O2': Options.OPTIMIZE,
+        '-O3': Options.OPTIMIZE
     }
 
+    # Options which may precede paths
+    LEADING_OPTIONS = ['-P', '-L', '-H', '-O0', '-O1', '-O2', '-O3']
+
     # Converts newerXY character to os.stat attribute name
     XY_CHAR_TO_STAT_NAME = {
         'a': 'st_atime',
@@ -1118,6 +3496,9 @@ class FinderArgParser:
         self._arg_idx = 0
         self._opt_idx = 0
         self._current_regex_type = RegexType.SED
+        self._fast_access = False
+        # Every AccessMatcher parsed so far, since -fastaccess applies to all of them
+        self._access_matchers = []
         self._current_option_arguments = []
         self._current_option = None
         self._current_option_name = None
@@ -1128,10 +3509,22 @@ class FinderArgParser:
         print(textwrap.dedent('''
     Partially implements find command entirely in Python.
 
-    Usage: refind [path...] [expression...]
+    Usage: refind [-H] [-L] [-P] [-Olevel] [path...] [expression...]
 
     default path is the current directory (.); default action is -print
 
+    symbolic link options
+        -P  Never follow symbolic links (default)
+        -L  Follow symbolic links; each directory is only walked once
+        -H  Only follow symbolic links given as a path
+
+    optimization options
+        -O0  Evaluate tests in the order given
+        -O1  Evaluate name and path tests first and content tests last (default)
+        -O2  Also evaluate type tests before tests which need stat
+        -O3  Order all tests by cost: name, type, stat, access, empty, then content
+             Tests are never moved across -prune
+
     operators
         ! EXPR
         -not EXPR  Inverts the resulting value of the expression
@@ -1146,11 +3539,26 @@ class FinderArgParser:
         -maxdepth LEVELS  Sets the maximum directory depth of find (default: inf)
         -mindepth LEVELS  Sets the minimum directory depth of find (default: 0)
         -regextype TYPE  Set the regex type to py, sed, egrep (default: sed)
+        -j N  Use N threads to list directories and match items (default: 1)
+        -unordered  Output items in any order when -j or -procs is greater than 1
+        -procs N  Use N processes to list directories and match their items
+        -prefetch N  Use N threads to stat all items of each directory as soon as it is listed
+                     when tests need stat data (default: 0)
+        -preloadids  Cache all user and group names before walking instead of looking up each
+                     ID when it is first needed
+        -fastaccess  Check permission bits from stat data for all -readable, -writable, and
+                     -executable instead of calling access; this ignores ACLs
+        -order ORDER  Set the order of items in each directory to name, readdir, inode
+                      (default: name)
+        -xdev
+        -mount  Don't descend into directories on other file systems
+        -follow  Same as -L
         --version  Shows version number and exits
 
     tests
         -name PATTERN  Tests against the name of item using fnmatch
         -regex PATTERN  Tests against the path to the item using re
+        -fullregex PATTERN  Same as -regex except the whole path must match, as in find
         -type [dfl]  Tests against item type directory, file, or link
         -path PATTERN
         -wholename PATTERN  Tests against the path to the item using fnmatch
@@ -1159,12 +3567,15 @@ class FinderArgParser:
         -atime [+-]N  Last accessed N, greater than +N, or less than -N days ago
         -cmin [+-]N  Change N, greater than +N, or less than -N minutes ago
         -cnewer FILE  Change time is more recent than given file
+        -contains TEXT  Matches files which contain TEXT
         -ctime [+-]N  Change N, greater than +N, or less than -N days ago
         -empty  File is 0 bytes or directory empty
         -executable  Matches items which are executable by current user
         -false  Always false
         -gid GID  Matches with group ID
+        -grep PATTERN  Matches files which contain a match of PATTERN using re
         -group GNAME  Matches with group name or ID
+        -links [+-]N  Has N, more than +N, or fewer than -N hard links
         -mmin [+-]N  Modified N, greater than +N, or less than -N minutes ago
         -newer FILE  Modified time is more recent than given file
         -mtime [+-]N  Modified N, greater than +N, or less than -N days ago
@@ -1212,7 +3623,15 @@ class FinderArgParser:
         -fpyprint0 FILE PYFORMAT  Same as above but write to given FILE instead of stdout
         -exec COMMAND ;  Execute the COMMAND where {} in the command is the matching path
         -pyexec PYFORMAT ;  Execute the COMMAND as a pyformat (see pyprint)
-        -delete  Deletes every matching path''').strip('\r\n'))
+        -delete  Deletes every matching path
+        -prune  Always true; do not descend into the directory if it is one
+        -quit  Exit immediately once the matching path is handled''').strip('\r\n'))
+
+    def _append_access_matcher(self, finder, access_type):
+        ''' Appends an AccessMatcher, which -fastaccess may still change until parsing ends '''
+        matcher = AccessMatcher(access_type, self._fast_access)
+        self._access_matchers.append(matcher)
+        finder.append_matcher(matcher)
 
     def _handle_option(self, finder):
         ''' Called when option parsed, returns True iff arg is expected '''
@@ -1235,24 +3654,47 @@ class FinderArgParser:
             finder.add_action(PrintAction(''))
         elif self._current_option == Options.DELETE:
             finder.add_action(DeleteAction())
+        elif self._current_option == Options.QUIT:
+            finder.add_action(QuitAction())
         elif self._current_option == Options.EMPTY:
             finder.append_matcher(EmptyMatcher())
         elif self._current_option == Options.EXECUTABLE:
-            finder.append_matcher(AccessMatcher(os.X_OK))
+            self._append_access_matcher(finder, os.X_OK)
         elif self._current_option == Options.READABLE:
-            finder.append_matcher(AccessMatcher(os.R_OK))
+            self._append_access_matcher(finder, os.R_OK)
         elif self._current_option == Options.WRITABLE:
-            finder.append_matcher(AccessMatcher(os.W_OK))
+            self._append_access_matcher(finder, os.W_OK)
+        elif self._current_option == Options.FAST_ACCESS:
+            # Same as other global options, this applies wherever it is placed
+            self._fast_access = True
+            for matcher in self._access_matchers:
+                matcher.set_from_stat(True)
         elif self._current_option == Options.FALSE:
             finder.append_matcher(StaticMatcher(False))
+        elif self._current_option == Options.PRUNE:
+            finder.append_matcher(PruneMatcher())
         elif self._current_option == Options.TRUE:
             finder.append_matcher(StaticMatcher(True))
         elif self._current_option == Options.NOGROUP:
-            finder.append_matcher(GroupMatcher('nogroup'))
+            finder.append_matcher(NoGroupMatcher())
         elif self._current_option == Options.NOUSER:
-            finder.append_matcher(GroupMatcher('nouser'))
+            finder.append_matcher(NoUserMatcher())
         elif self._current_option == Options.VERBOSE:
             finder.set_verbose(True)
+        elif self._current_option == Options.UNORDERED:
+            finder.set_ordered(False)
+        elif self._current_option == Options.XDEV:
+            finder.set_xdev(True)
+        elif self._current_option == Options.PRELOAD_IDS:
+            finder.set_preload_ids(True)
+        elif self._current_option == Options.OPTIMIZE:
+            finder.set_optimization(int(self._current_option_name[2:]))
+        elif self._current_option == Options.NEVER_FOLLOW:
+            finder.set_follow_links(FollowLinks.NEVER)
+        elif self._current_option == Options.FOLLOW:
+            finder.set_follow_links(FollowLinks.ALWAYS)
+        elif self._current_option == Options.FOLLOW_ROOTS:
+            finder.set_follow_links(FollowLinks.ROOTS)
         else:
             # All other options require an argument
             return True
@@ -1343,6 +3785,34 @@ class FinderArgParser:
             except:
                 raise ValueError('Invalid value given to min depth: {}'.format(self._current_argument))
             finder.set_min_depth(min_depth)
+        elif self._current_option == Options.WORKERS:
+            try:
+                workers = int(self._current_argument)
+            except ValueError:
+                raise ValueError('Invalid value given to -j: {}'.format(self._current_argument))
+            finder.set_workers(workers)
+        elif self._current_option == Options.PROCESSES:
+            try:
+                processes = int(self._current_argument)
+            except ValueError:
+                raise ValueError('Invalid value given to -procs: {}'.format(self._current_argument))
+            finder.set_processes(processes)
+        elif self._current_option == Options.PREFETCH:
+            try:
+                threads = int(self._current_argument)
+            except ValueError:
+                raise ValueError('Invalid value given to -prefetch: {}'.format(self._current_argument))
+            finder.set_prefetch(threads)
+        elif self._current_option == Options.ORDER:
+            if self._current_argument == 'name':
+                finder.set_order(WalkOrder.NAME)
+            elif self._current_argument == 'readdir':
+                finder.set_order(WalkOrder.READDIR)
+            elif self._current_argument == 'inode':
+                finder.set_order(WalkOrder.INODE)
+            else:
+                raise ValueError(
+                    'Unknown order {}; valid orders are name, readdir, inode.'.format(self._current_argument))
         elif self._current_option == Options.REGEX_TYPE:
             if self._current_argument == 'py':
                 self._current_regex_type = RegexType.PY
@@ -1359,6 +3829,9 @@ class FinderArgParser:
             finder.append_matcher(FullPathMatcher(self._current_argument))
         elif self._current_option == Options.REGEX:
             finder.append_matcher(RegexMatcher(self._current_argument, self._current_regex_type))
+        elif self._current_option == Options.FULL_REGEX:
+            finder.append_matcher(
+                RegexMatcher(self._current_argument, self._current_regex_type, full_match=True))
         elif self._current_option == Options.AMIN or self._current_option == Options.CMIN or self._current_option == Options.MMIN:
             value_comparison, value = __class__._parse_n(self._current_argument)
             if value is None:
@@ -1410,6 +3883,10 @@ class FinderArgParser:
             else:
                 matcher_args += ['st_mtime']
             finder.append_matcher(StatTimeIncrementMatcher(*matcher_args))
+        elif self._current_option == Options.CONTAINS:
+            finder.append_matcher(ContentMatcher(self._current_argument))
+        elif self._current_option == Options.GREP:
+            finder.append_matcher(ContentMatcher(self._current_argument, self._current_regex_type))
         elif self._current_option == Options.GID:
             try:
                 gid = int(self._current_argument)
@@ -1418,6 +3895,11 @@ class FinderArgParser:
             finder.append_matcher(GroupMatcher(gid))
         elif self._current_option == Options.GROUP:
             finder.append_matcher(GroupMatcher(self._current_argument))
+        elif self._current_option == Options.LINKS:
+            value_comparison, value = __class__._parse_n(self._current_argument)
+            if value is None or value != int(value):
+                raise ValueError('Invalid argument for -links ({}); expected integer'.format(self._current_argument))
+            finder.append_matcher(LinksMatcher(value_comparison, int(value)))
         elif self._current_option == Options.UID:
             try:
                 uid = int(self._current_argument)
@@ -1500,7 +3982,8 @@ class FinderArgParser:
                     self._current_option_name = None
                     self._current_option_arguments = []
             else:
-                self._opt_idx += 1
+                if self._opt_idx != 0 or arg not in __class__.LEADING_OPTIONS:
+                    self._opt_idx += 1
                 self._current_option = opt
                 self._current_option_name = arg
                 if not self._handle_option(finder):
@@ -0,0 +1,102 @@
+#!/bin/env python3
+
+# MIT License
+#
+# Copyright (c) 2023 James Smith
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+'''
+Compares the per entry overhead of evaluating a matcher expression through Matcher.is_match()
+against the function returned by Matcher.compile(), for expressions of 1, 5 and 20 terms. Every
+term matches so that no evaluation is short-circuited. Then compares OR chains of 10, 100 and 1000
+name patterns against the NameSetMatcher they are merged into. No file system access is made.
+
+Usage: python tests/bench_matcher.py [ENTRIES]
+'''
+
+import os
+import sys
+import time
+
+THIS_FILE_PATH = os.path.dirname(os.path.abspath(os.path.realpath(__file__)))
+PROJECT_DIR = os.path.abspath(os.path.join(THIS_FILE_PATH, '..'))
+SOURCE_DIR = os.path.abspath(os.path.join(PROJECT_DIR, 'src'))
+
+sys.path.insert(0, SOURCE_DIR)
+from refind import find
+
+def make_terms(count):
+    ''' Returns (matcher, invert) for count terms which all match the entries of make_entries() '''
+    terms = []
+    for i in range(count):
+        if i % 3 == 0:
+            terms.append((find.NameMatcher('file*'), False))
+        elif i % 3 == 1:
+            terms.append((find.NameMatcher('*.tmp'), True))
+        else:
+            terms.append((find.FullPathMatcher('*dir*'), False))
+    return terms
+
+def make_entries(count):
+    return [
+        find.PathParser('root', (os.path.join('root', 'dir{}'.format(i % 100)), 'file{}.log'.format(i)))
+        for i in range(count)
+    ]
+
+def time_per_entry(fn, entries):
+    start = time.perf_counter()
+    for entry in entries:
+        fn(entry)
+    return (time.perf_counter() - start) / len(entries)
+
+def main(argv):
+    entry_count = int(argv[0]) if len(argv) > 0 else 100000
+    entries = make_entries(entry_count)
+    print('{:<8}{:>16}{:>16}{:>10}'.format('terms', 'is_match ns', 'compiled ns', 'speedup'))
+    for term_count in [1, 5, 20]:
+        finder = find.Finder()
+        for term, invert in make_terms(term_count):
+            finder.set_invert(invert)
+            finder.append_matcher(term)
+        matcher = finder._matcher
+        compiled = matcher.compile()
+        assert all(compiled(entry) for entry in entries[:100])
+        tree_s = time_per_entry(matcher.is_match, entries)
+        compiled_s = time_per_entry(compiled, entries)
+        print('{:<8}{:>16.0f}{:>16.0f}{:>9.1f}x'.format(
+            term_count, tree_s * 1e9, compiled_s * 1e9, tree_s / compiled_s))
+
+    print()
+    print('{:<8}{:>16}{:>16}{:>10}'.format('names', '-O0 ns', '-O1 ns', 'speedup'))
+    for pattern_count in [10, 100, 1000]:
+        finder = find.Finder()
+        for i in range(pattern_count):
+            # None of these match so that every pattern is checked
+            pattern = 'tmp{}*'.format(i) if i % 2 else '*.ext{}'.format(i)
+            finder.append_matcher(find.NameMatcher(pattern), find.LogicOperation.OR)
+        chain = finder._matcher.compile()
+        merged = finder._matcher.optimize(1).compile()
+        chain_s = time_per_entry(chain, entries)
+        merged_s = time_per_entry(merged, entries)
+        print('{:<8}{:>16.0f}{:>16.0f}{:>9.1f}x'.format(
+            pattern_count, chain_s * 1e9, merged_s * 1e9, chain_s / merged_s))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,85 @@
+#!/bin/env python3
+
+# MIT License
+#
+# Copyright (c) 2023 James Smith
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+'''
+Measures the memory held by the list of matches returned by Finder.execute(), scaled to one
+million entries, using a synthetic directory tree.
+
+Usage: python tests/bench_memory.py [DIRS] [FILES_PER_DIR]
+'''
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+THIS_FILE_PATH = os.path.dirname(os.path.abspath(os.path.realpath(__file__)))
+PROJECT_DIR = os.path.abspath(os.path.join(THIS_FILE_PATH, '..'))
+SOURCE_DIR = os.path.abspath(os.path.join(PROJECT_DIR, 'src'))
+
+sys.path.insert(0, SOURCE_DIR)
+from refind import find
+
+def make_tree(root, dirs, files_per_dir):
+    for i in range(dirs):
+        dir_path = os.path.join(root, 'dir{}'.format(i))
+        os.mkdir(dir_path)
+        for j in range(files_per_dir):
+            with open(os.path.join(dir_path, 'file{}.log'.format(j)), 'w'):
+                pass
+
+def run(root_dir, matcher=None):
+    finder = find.Finder()
+    finder.add_root(root_dir)
+    if matcher is not None:
+        finder.append_matcher(matcher)
+    tracemalloc.start()
+    start = time.perf_counter()
+    matches = finder.execute()
+    elapsed = time.perf_counter() - start
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (len(matches), retained, peak, elapsed)
+
+def main(argv):
+    dirs = int(argv[0]) if len(argv) > 0 else 100
+    files_per_dir = int(argv[1]) if len(argv) > 1 else 1000
+    queries = [
+        ('(all)', lambda: None),
+        ('-type f', lambda: find.TypeMatcher(find.FindType.FILE)),
+        ('(stat)', lambda: find.StatTimeMatcher(find.ValueComparison.GREATER_THAN, 0.0, 'st_mtime'))
+    ]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        make_tree(tmpdir, dirs, files_per_dir)
+        print('{:<10}{:>10}{:>18}{:>18}{:>10}'.format(
+            'query', 'matches', 'retained MB/1M', 'peak MB/1M', 'seconds'))
+        for name, matcher_fn in queries:
+            count, retained, peak, elapsed = run(tmpdir, matcher_fn())
+            scale = 1000000 / count / (1024 * 1024)
+            print('{:<10}{:>10}{:>18.1f}{:>18.1f}{:>10.3f}'.format(
+                name, count, retained * scale, peak * scale, elapsed))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
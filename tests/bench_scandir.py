@@ -0,0 +1,218 @@
+#!/bin/env python3
+
+# MIT License
+#
+# Copyright (c) 2023 James Smith
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+'''
+Compares the number of stat calls and run time of full find invocations, from parsing arguments to
+printing matches, of this tree against a baseline revision of refind, using a synthetic directory
+tree. The baseline is loaded from git, so this must run from within the repository.
+
+Usage: python tests/bench_scandir.py [DIRS_PER_LEVEL] [FILES_PER_DIR] [DEPTH] [BASELINE_REV]
+'''
+
+import os
+import sys
+import tempfile
+import time
+import types
+import subprocess
+
+THIS_FILE_PATH = os.path.dirname(os.path.abspath(os.path.realpath(__file__)))
+PROJECT_DIR = os.path.abspath(os.path.join(THIS_FILE_PATH, '..'))
+SOURCE_DIR = os.path.abspath(os.path.join(PROJECT_DIR, 'src'))
+
+sys.path.insert(0, SOURCE_DIR)
+from refind import find
+
+# The revision which refind was forked from, before os.scandir() was used
+DEFAULT_BASELINE_REV = 'aeb60c9'
+# Each query is run this many times, and the fastest run is reported
+RUNS = 9
+
+QUERIES = [
+    ['-type', 'f'],
+    ['-type', 'd'],
+    ['-name', '*.log'],
+    ['-mmin', '-60'],
+    ['-type', 'f', '-mmin', '-60'],
+    ['-type', 'f', '-empty'],
+    ['-newer', '{root}'],
+    ['-name', 'file1*', '-o', '-empty']
+]
+
+class StatCounter:
+    ''' Counts calls to os.stat(), os.lstat() and os.DirEntry.stat() while active '''
+    def __init__(self):
+        self.count = 0
+        self._orig_stat = os.stat
+        self._orig_lstat = os.lstat
+        self._orig_scandir = os.scandir
+
+    def __enter__(self):
+        counter = self
+
+        class CountingEntry:
+            def __init__(self, entry):
+                self._entry = entry
+                self._stat = {}
+                self.name = entry.name
+                self.path = entry.path
+
+            def __getattr__(self, name):
+                return getattr(self._entry, name)
+
+            def __fspath__(self):
+                return self.path
+
+            def stat(self, *, follow_symlinks=True):
+                if follow_symlinks not in self._stat:
+                    # DirEntry caches its stat result, so only the first call is a system call
+                    counter.count += 1
+                    self._stat[follow_symlinks] = self._entry.stat(follow_symlinks=follow_symlinks)
+                return self._stat[follow_symlinks]
+
+        class CountingScandir:
+            def __init__(self, it):
+                self._it = it
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                self._it.close()
+
+            def __iter__(self):
+                return (CountingEntry(entry) for entry in self._it)
+
+            def __next__(self):
+                return CountingEntry(next(self._it))
+
+            def close(self):
+                self._it.close()
+
+        def counting_stat(*args, **kwargs):
+            counter.count += 1
+            return counter._orig_stat(*args, **kwargs)
+
+        def counting_lstat(*args, **kwargs):
+            counter.count += 1
+            return counter._orig_lstat(*args, **kwargs)
+
+        os.stat = counting_stat
+        os.lstat = counting_lstat
+        os.scandir = lambda *args, **kwargs: CountingScandir(counter._orig_scandir(*args, **kwargs))
+        return self
+
+    def __exit__(self, *args):
+        os.stat = self._orig_stat
+        os.lstat = self._orig_lstat
+        os.scandir = self._orig_scandir
+
+def make_tree(root, dirs_per_level, files_per_dir, depth):
+    if depth <= 0:
+        return
+    for i in range(files_per_dir):
+        with open(os.path.join(root, 'file{}.log'.format(i)), 'w') as fd:
+            # Some files are empty and some are not so that -size and -empty match part of them
+            fd.write('x' * (i % 3) * 1000)
+    for i in range(dirs_per_level):
+        dir_path = os.path.join(root, 'dir{}'.format(i))
+        os.mkdir(dir_path)
+        make_tree(dir_path, dirs_per_level, files_per_dir, depth - 1)
+
+def load_baseline(rev):
+    ''' Returns the find module of refind at the given git revision '''
+    source = subprocess.check_output(
+        ['git', 'show', '{}:src/refind/find.py'.format(rev)], cwd=PROJECT_DIR)
+    module = types.ModuleType('refind_baseline_find')
+    module.__file__ = '{}:src/refind/find.py'.format(rev)
+    exec(compile(source, module.__file__, 'exec'), module.__dict__)
+    return module
+
+def run_once(find_module, args):
+    '''
+    Runs main() of the given find module with args, printing matches to os.devnull.
+    Returns: a tuple of the run time in seconds and the number of lines printed
+    '''
+    orig_stdout = sys.stdout
+    with open(os.devnull, 'w') as devnull:
+        lines = []
+        class LineCounter:
+            def write(self, text):
+                lines.append(text.count('\n'))
+                return devnull.write(text)
+            def flush(self):
+                devnull.flush()
+        sys.stdout = LineCounter()
+        try:
+            start = time.perf_counter()
+            find_module.main(args)
+            elapsed = time.perf_counter() - start
+        finally:
+            sys.stdout = orig_stdout
+    return (elapsed, sum(lines))
+
+def count_stats(find_module, args):
+    ''' Returns the number of stat calls made by main() of the given find module with args '''
+    # Stat calls are counted in a separate run since counting slows down each os.DirEntry access
+    with StatCounter() as counter:
+        run_once(find_module, args)
+    return counter.count
+
+def run(find_modules, args):
+    '''
+    Runs main() of each of the given find modules with args, taking turns so that a change of load
+    on the machine affects each of them alike.
+    Returns: a list of the fastest run time in seconds of each module and a list of the number of
+             lines printed by each module
+    '''
+    best_s = [None] * len(find_modules)
+    matches = [None] * len(find_modules)
+    for _ in range(RUNS):
+        for i, find_module in enumerate(find_modules):
+            elapsed, matches[i] = run_once(find_module, args)
+            if best_s[i] is None or elapsed < best_s[i]:
+                best_s[i] = elapsed
+    return (best_s, matches)
+
+def main(argv):
+    dirs_per_level = int(argv[0]) if len(argv) > 0 else 8
+    files_per_dir = int(argv[1]) if len(argv) > 1 else 50
+    depth = int(argv[2]) if len(argv) > 2 else 4
+    baseline_rev = argv[3] if len(argv) > 3 else DEFAULT_BASELINE_REV
+    baseline = load_baseline(baseline_rev)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        make_tree(tmpdir, dirs_per_level, files_per_dir, depth)
+        print('{:<30}{:>14}{:>14}{:>12}{:>12}{:>10}'.format(
+            'query', 'baseline stats', 'stats', 'baseline s', 'time s', 'matches'))
+        for query in QUERIES:
+            args = [tmpdir] + [arg.format(root=tmpdir) for arg in query]
+            (baseline_s, elapsed), (baseline_matches, matches) = run([baseline, find], args)
+            assert baseline_matches == matches, (query, baseline_matches, matches)
+            baseline_stats = count_stats(baseline, args)
+            stats = count_stats(find, args)
+            print('{:<30}{:>14}{:>14}{:>12.3f}{:>12.3f}{:>10}'.format(
+                ' '.join(query), baseline_stats, stats, baseline_s, elapsed, matches))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -27,6 +27,14 @@ from unittest.mock import patch
 import os
 import sys
 import tempfile
+import asyncio
+import threading
+import pickle
+import fnmatch
+import re
+import glob
+import concurrent.futures
+import time
 from io import StringIO
 
 THIS_FILE_PATH = os.path.dirname(os.path.abspath(os.path.realpath(__file__)))
@@ -224,6 +232,40 @@ class RefindTests(unittest.TestCase):
             ''
         ])
 
+    def test_regex_invalid_pattern(self):
+        with self.assertRaises(ValueError):
+            find.main(['.', '-regextype', 'py', '-regex', 'file(1'])
+        # sed escaping is inverted, so this is an unbalanced group once translated
+        with self.assertRaises(ValueError):
+            find.main(['.', '-regextype', 'sed', '-regex', 'file\\(1'])
+
+    def test_regex_required_literals(self):
+        self.assertEqual(
+            find.RegexMatcher._get_required_literals(re.compile(r'.*/dir(1|2)/file\d+\.txt$')),
+            ['/file', '/dir', '.txt'])
+        self.assertEqual(
+            find.RegexMatcher._get_required_literals(re.compile(r'(?i).*\.txt')), [])
+        self.assertEqual(
+            find.RegexMatcher._get_required_literals(re.compile(r'(ab)?c*|d')), [])
+
+    def test_fullregex(self):
+        with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+            find.main(['.', '-regextype', 'py', '-regex', 'file[1-3]'])
+            search_lines = fake_out.getvalue().split('\n')
+        with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+            find.main(['.', '-regextype', 'py', '-fullregex', 'file[1-3]'])
+            lines = fake_out.getvalue().split('\n')
+        self.assertGreater(len(search_lines), 1)
+        self.assertEqual(lines, [''])
+        with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+            find.main(['.', '-regextype', 'py', '-fullregex', '.*[\\/]file[1-3].txt'])
+            lines = fake_out.getvalue().split('\n')
+        s = os.path.sep
+        self.assertEqual(lines, [
+            f'.{s}file1.txt', f'.{s}file2.txt', f'.{s}file3.txt',
+            ''
+        ])
+
     def test_path(self):
         s = os.path.sep
         with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
@@ -234,6 +276,43 @@ class RefindTests(unittest.TestCase):
             ''
         ])
 
+    @unittest.skipIf(os.path.normcase('A') != 'A', 'paths are compared case insensitively')
+    def test_path_skips_unmatchable_dirs(self):
+        s = os.path.sep
+        scanned = []
+        scan_dir = find.Finder._scan_dir
+        def record_scan_dir(finder, dir_path):
+            scanned.append(dir_path)
+            return scan_dir(finder, dir_path)
+        with patch.object(find.Finder, '_scan_dir', record_scan_dir):
+            with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+                find.main(['.', '-path', f'.{s}dir2{s}*', '-o', '-regex', f'^\\.\\{s}dir3\\{s}.*-1'])
+                lines = fake_out.getvalue().split('\n')
+        self.assertEqual(lines, [
+            f'.{s}dir2{s}dirfile2-1.txt', f'.{s}dir2{s}dirfile2-2.txt', f'.{s}dir2{s}dirfile2-3.txt',
+            f'.{s}dir3{s}dirfile3-1.txt',
+            ''
+        ])
+        self.assertEqual(scanned, ['.', f'.{s}dir2', f'.{s}dir3'])
+
+    @unittest.skipIf(os.path.normcase('A') != 'A', 'paths are compared case insensitively')
+    def test_path_prefixes(self):
+        path = find.FullPathMatcher('./src/*/config/*.yaml')
+        self.assertEqual(path.path_prefixes, ['./src/'])
+        regex = find.RegexMatcher('./src/.*', find.RegexType.PY)
+        self.assertIsNone(regex.path_prefixes)
+        regex = find.RegexMatcher(r'\./src/a.*', find.RegexType.PY, full_match=True)
+        self.assertEqual(regex.path_prefixes, ['./src/a'])
+        gate = find.GatedMatcher(path, regex, find.LogicOperation.AND)
+        self.assertEqual(gate.path_prefixes, ['./src/a'])
+        gate = find.GatedMatcher(path, find.FullPathMatcher('./doc/*'), find.LogicOperation.OR)
+        self.assertEqual(gate.path_prefixes, ['./doc/', './src/'])
+        # Operands after one with side effects may not be evaluated
+        gate = find.GatedMatcher(find.PruneMatcher(), path, find.LogicOperation.AND)
+        self.assertIsNone(gate.path_prefixes)
+        path.set_invert(True)
+        self.assertIsNone(path.path_prefixes)
+
     def test_wholename(self):
         s = os.path.sep
         with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
@@ -244,5 +323,962 @@ class RefindTests(unittest.TestCase):
             ''
         ])
 
+    def test_type_dir(self):
+        with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+            find.main(['.', '-type', 'd'])
+            lines = fake_out.getvalue().split('\n')
+        s = os.path.sep
+        self.assertEqual(lines, ['.', f'.{s}dir1', f'.{s}dir2', f'.{s}dir3', f'.{s}dir4', ''])
+
+    def test_scandir_type_without_stat(self):
+        finder = find.Finder()
+        finder.add_root('.')
+        finder.append_matcher(find.TypeMatcher(find.FindType.FILE))
+        matches = finder.execute()
+        self.assertEqual(len(matches), 16)
+        for match in matches:
+            # Type was resolved from the directory entry; no stat was needed
+            self.assertIsNone(match._stat)
+            # Only the type given by the directory entry is kept once the match was handled
+            self.assertIsNone(match._dir_entry)
+            self.assertEqual(match.get_type(), find.FindType.FILE)
+            self.assertEqual(match._read_link(), '')
+            self.assertIsNone(match._stat)
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        os.mkdir(os.path.join(root.name, 'dir'))
+        os.symlink('dir', os.path.join(root.name, 'link'))
+        for follow, expected in [('-P', find.FindType.SYMBOLIC_LINK), ('-L', find.FindType.DIRECTORY)]:
+            finder = find.Finder()
+            find.FinderArgParser().parse([follow, root.name, '-name', 'link'], finder)
+            match, = finder.execute()
+            self.assertIsNone(match._dir_entry)
+            self.assertEqual(match.get_type(), expected, follow)
+            self.assertEqual(match._read_link(), 'dir')
+
+    def test_maxdepth(self):
+        with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+            with patch('refind.find.os.scandir', wraps=os.scandir) as scandir_mock:
+                find.main(['.', '-maxdepth', '1', '-type', 'f'])
+            lines = fake_out.getvalue().split('\n')
+        s = os.path.sep
+        self.assertEqual(lines, [
+            f'.{s}file1.txt', f'.{s}file2.txt', f'.{s}file3.txt', f'.{s}file4.txt',
+            ''
+        ])
+        # Sub directories are never opened
+        self.assertEqual([c[0][0] for c in scandir_mock.call_args_list], ['.'])
+
+    def test_mindepth(self):
+        with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+            find.main(['.', '-mindepth', '2', '-name', '*-1.txt'])
+            lines = fake_out.getvalue().split('\n')
+        s = os.path.sep
+        self.assertEqual(lines, [
+            f'.{s}dir1{s}dirfile1-1.txt', f'.{s}dir2{s}dirfile2-1.txt',
+            f'.{s}dir3{s}dirfile3-1.txt', f'.{s}dir4{s}dirfile4-1.txt',
+            ''
+        ])
+
+    def test_depth_from_walk(self):
+        finder = find.Finder()
+        finder.add_root('.')
+        depths = {match.name: match.get_rel_depth() for match in finder.execute()}
+        self.assertEqual(depths['.'], 0)
+        self.assertEqual(depths['dir1'], 1)
+        self.assertEqual(depths['file1.txt'], 1)
+        self.assertEqual(depths['dirfile1-1.txt'], 2)
+
+    def test_prune(self):
+        with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+            with patch('refind.find.os.scandir', wraps=os.scandir) as scandir_mock:
+                find.main(['.', '-name', 'dir[23]', '-prune', '-false', '-o', '-type', 'f'])
+            lines = fake_out.getvalue().split('\n')
+        s = os.path.sep
+        self.assertEqual(lines, [
+            f'.{s}file1.txt', f'.{s}file2.txt', f'.{s}file3.txt', f'.{s}file4.txt',
+            f'.{s}dir1{s}dirfile1-1.txt', f'.{s}dir1{s}dirfile1-2.txt', f'.{s}dir1{s}dirfile1-3.txt',
+            f'.{s}dir4{s}dirfile4-1.txt', f'.{s}dir4{s}dirfile4-2.txt', f'.{s}dir4{s}dirfile4-3.txt',
+            ''
+        ])
+        # Pruned directories are never opened
+        self.assertEqual(
+            [c[0][0] for c in scandir_mock.call_args_list],
+            ['.', f'.{s}dir1', f'.{s}dir4']
+        )
+
+    def test_prune_root(self):
+        with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+            find.main(['.', '-prune'])
+            lines = fake_out.getvalue().split('\n')
+        self.assertEqual(lines, ['.', ''])
+
+    def test_workers_ordered(self):
+        with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+            find.main(['.'])
+            expected = fake_out.getvalue()
+        with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+            find.main(['.', '-j', '4'])
+            self.assertEqual(fake_out.getvalue(), expected)
+
+    def test_workers_unordered(self):
+        with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+            find.main(['.', '-name', 'dir*'])
+            expected = fake_out.getvalue().split('\n')
+        with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+            find.main(['.', '-j', '4', '-unordered', '-name', 'dir*'])
+            lines = fake_out.getvalue().split('\n')
+        self.assertEqual(sorted(lines), sorted(expected))
+
+    def test_workers_prune(self):
+        s = os.path.sep
+        with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+            find.main(['.', '-j', '3', '-name', 'dir[1-3]', '-prune', '-false', '-o', '-type', 'f'])
+            lines = fake_out.getvalue().split('\n')
+        self.assertEqual(lines, [
+            f'.{s}file1.txt', f'.{s}file2.txt', f'.{s}file3.txt', f'.{s}file4.txt',
+            f'.{s}dir4{s}dirfile4-1.txt', f'.{s}dir4{s}dirfile4-2.txt', f'.{s}dir4{s}dirfile4-3.txt',
+            ''
+        ])
+
+    def test_workers_listing_ahead(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        for i in range(200):
+            os.mkdir(os.path.join(root.name, 'dir{:03}'.format(i)))
+            with open(os.path.join(root.name, 'dir{:03}'.format(i), 'file.txt'), 'w'):
+                pass
+        listed = []
+        match_dir = find.Finder._match_dir
+        def record_match_dir(finder, root_dir, dir_path, *args):
+            listed.append(dir_path)
+            return match_dir(finder, root_dir, dir_path, *args)
+        finder = find.Finder()
+        find.FinderArgParser().parse([root.name, '-j', '2', '-name', 'file.txt'], finder)
+        max_ahead = 2 * find.LISTING_AHEAD_PER_WORKER
+        with patch.object(find.Finder, '_match_dir', record_match_dir):
+            count = 0
+            for match in finder.iter():
+                self.assertEqual(match.root, os.path.join(root.name, 'dir{:03}'.format(count)))
+                count += 1
+                # A slow consumer; only a few directories are listed ahead of the one handled,
+                # besides the root and those already handled
+                time.sleep(0.002)
+                self.assertLessEqual(len(listed), 1 + count + max_ahead, count)
+        self.assertEqual(count, 200)
+        self.assertEqual(len(listed), 201)
+        # Directories dropped from the look ahead are listed again in order on deeper trees
+        for i in range(0, 200, 20):
+            for j in range(3):
+                os.makedirs(os.path.join(root.name, 'dir{:03}'.format(i), 'sub{}'.format(j), 'x'))
+        args = [root.name, '-name', 'sub*', '-o', '-name', 'x']
+        outputs = []
+        for workers in ['1', '2']:
+            with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+                find.main(args + ['-j', workers])
+            outputs.append(fake_out.getvalue())
+        self.assertEqual(len(outputs[0].splitlines()), 60)
+        self.assertEqual(outputs[0], outputs[1])
+
+    def test_processes(self):
+        args = ['.', '-name', '*.txt', '-printf', '%d %p\\n', '-fprint', 'out.lst']
+        with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+            find.main(args)
+            expected = fake_out.getvalue()
+        with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+            find.main(args + ['-procs', '2'])
+            self.assertEqual(fake_out.getvalue(), expected)
+        os.remove('out.lst')
+
+    def test_processes_quit(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        for i in range(4):
+            dir_path = os.path.join(root.name, 'dir{}'.format(i))
+            os.mkdir(dir_path)
+            for j in range(4):
+                with open(os.path.join(dir_path, 'file{}.txt'.format(j)), 'w'):
+                    pass
+        def count(pattern):
+            return len(glob.glob(os.path.join(root.name, '*', pattern)))
+        # No action is executed by workers past the match which quits the walk
+        with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+            find.main([
+                root.name, '-procs', '2', '-name', '*.txt', '-exec', 'touch', '{}.seen', ';',
+                '-print', '-quit'
+            ])
+        self.assertEqual(count('*.seen'), 1)
+        self.assertEqual(len(fake_out.getvalue().splitlines()), 1)
+        find.main([root.name, '-procs', '2', '-name', '*.txt', '-delete', '-quit'])
+        self.assertEqual(count('*.txt'), 15)
+        # Same when the walk stops after max_results
+        finder = find.Finder()
+        find.FinderArgParser().parse([root.name, '-procs', '2', '-name', '*.txt', '-delete'], finder)
+        self.assertEqual(len(finder.execute(max_results=2)), 2)
+        self.assertEqual(count('*.txt'), 13)
+
+    @unittest.skipIf(sys.platform == 'win32', 'sh not available')
+    def test_processes_skewed_tree(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        # The whole tree is under one directory
+        for i in range(20):
+            for j in range(3):
+                dir_path = os.path.join(root.name, 'a', 'b{:02}'.format(i), 'c{}'.format(j))
+                os.makedirs(dir_path)
+                with open(os.path.join(dir_path, 'f'), 'w'):
+                    pass
+        submitted = []
+        submit = concurrent.futures.ProcessPoolExecutor.submit
+        def record_submit(executor, fn, description, root_dir, dir_path, *args):
+            submitted.append(dir_path)
+            return submit(executor, fn, description, root_dir, dir_path, *args)
+        finder = find.Finder()
+        find.FinderArgParser().parse([root.name, '-procs', '2', '-name', 'f'], finder)
+        with patch.object(concurrent.futures.ProcessPoolExecutor, 'submit', record_submit):
+            matches = finder.iter()
+            next(matches)
+            # Matches are sent back as each directory is done, and only the directories next in
+            # line were submitted
+            self.assertLessEqual(len(set(submitted)), 4 + 4 * find.LISTING_AHEAD_PER_WORKER)
+            self.assertEqual(len(list(matches)), 59)
+        # Each directory, however deep, is its own task
+        self.assertEqual(len(set(submitted)), 1 + 1 + 20 + 60)
+        # Output of -exec follows the order of the walk
+        log_path = os.path.join(root.name, 'log')
+        expressions = {}
+        for procs in ['1', '2']:
+            find.main([
+                root.name, '-procs', procs, '-name', 'c*', '-exec', 'sh', '-c',
+                'echo "$0" >> "$1"', '{}', log_path, ';'
+            ])
+            with open(log_path) as fd:
+                expressions[procs] = fd.read()
+            os.remove(log_path)
+        self.assertEqual(len(expressions['1'].splitlines()), 60)
+        self.assertEqual(expressions['1'], expressions['2'])
+
+    def test_processes_return_list(self):
+        finder = find.Finder()
+        finder.add_root('.')
+        finder.append_matcher(find.RegexMatcher('.*dirfile[12]-[12].txt', find.RegexType.PY))
+        finder.set_processes(2)
+        matches = finder.execute()
+        s = os.path.sep
+        self.assertEqual([match.full_path for match in matches], [
+            f'.{s}dir1{s}dirfile1-1.txt', f'.{s}dir1{s}dirfile1-2.txt',
+            f'.{s}dir2{s}dirfile2-1.txt', f'.{s}dir2{s}dirfile2-2.txt'
+        ])
+
+    def test_iter(self):
+        finder = find.Finder()
+        finder.add_root('.')
+        finder.append_matcher(find.TypeMatcher(find.FindType.FILE))
+        output = StringIO()
+        finder.add_action(find.PrintAction(file=output))
+        s = os.path.sep
+        with patch('refind.find.os.scandir', wraps=os.scandir) as scandir_mock:
+            matches = iter(finder)
+            self.assertEqual(next(matches).full_path, f'.{s}file1.txt')
+            matches.close()
+        # Actions were executed on the way and the walk was abandoned after the first listing
+        self.assertEqual(output.getvalue(), f'.{s}file1.txt\n')
+        self.assertEqual(scandir_mock.call_count, 1)
+
+    def test_iter_workers_abandoned(self):
+        finder = find.Finder()
+        finder.add_root('.')
+        finder.set_workers(4)
+        matches = finder.iter()
+        self.assertEqual(next(matches).full_path, '.')
+        self.assertEqual(next(matches).name, 'dir1')
+        matches.close()
+        self.assertEqual(list(matches), [])
+
+    def test_aiter(self):
+        finder = find.Finder()
+        finder.add_root('.')
+        expected = [match.full_path for match in finder.execute()]
+
+        async def collect():
+            return [match.full_path async for match in finder.aiter(max_outstanding=3)]
+
+        loop = asyncio.new_event_loop()
+        try:
+            self.assertEqual(loop.run_until_complete(collect()), expected)
+            matches = loop.run_until_complete(finder.aexecute(return_list=True))
+            self.assertEqual([match.full_path for match in matches], expected)
+        finally:
+            loop.close()
+
+    def test_aiter_listing_ahead(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        for i in range(300):
+            os.mkdir(os.path.join(root.name, 'd{:03}'.format(i)))
+            with open(os.path.join(root.name, 'd{:03}'.format(i), 'f'), 'w'):
+                pass
+        listed = []
+        match_dir = find.Finder._match_dir
+        def record_match_dir(finder, root_dir, dir_path, *args):
+            listed.append(dir_path)
+            return match_dir(finder, root_dir, dir_path, *args)
+        finder = find.Finder()
+        find.FinderArgParser().parse([root.name, '-name', 'f'], finder)
+
+        async def first_matches():
+            matches = []
+            async for match in finder.aiter(max_outstanding=2):
+                matches.append(match.full_path)
+                # Only the directories next in line were listed, the awaited one first
+                self.assertLessEqual(len(listed), 1 + len(matches) + 2)
+                if len(matches) == 3:
+                    return matches
+
+        loop = asyncio.new_event_loop()
+        try:
+            with patch.object(find.Finder, '_match_dir', record_match_dir):
+                matches = loop.run_until_complete(first_matches())
+        finally:
+            loop.close()
+        self.assertEqual(
+            matches, [os.path.join(root.name, 'd{:03}'.format(i), 'f') for i in range(3)])
+        self.assertEqual(listed[:2], [root.name, os.path.join(root.name, 'd000')])
+
+    def test_aiter_cancel(self):
+        finder = find.Finder()
+        finder.add_root('.')
+        found = []
+
+        async def consume():
+            async for match in finder:
+                found.append(match)
+                await asyncio.sleep(10)
+
+        async def cancel_after_first():
+            task = asyncio.ensure_future(consume())
+            while not found:
+                await asyncio.sleep(0.01)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(cancel_after_first())
+        finally:
+            loop.close()
+        self.assertEqual([match.full_path for match in found], ['.'])
+
+    def test_quit(self):
+        s = os.path.sep
+        with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+            with patch('refind.find.os.scandir', wraps=os.scandir) as scandir_mock:
+                find.main(['.', '-name', 'file2.txt', '-print', '-quit', '-print'])
+            lines = fake_out.getvalue().split('\n')
+        self.assertEqual(lines, [f'.{s}file2.txt', ''])
+        self.assertEqual(scandir_mock.call_count, 1)
+
+    def test_max_results(self):
+        finder = find.Finder()
+        finder.add_root('.')
+        finder.append_matcher(find.NameMatcher('dirfile*'))
+        s = os.path.sep
+        with patch('refind.find.os.scandir', wraps=os.scandir) as scandir_mock:
+            matches = finder.execute(max_results=2)
+        self.assertEqual(
+            [match.full_path for match in matches],
+            [f'.{s}dir1{s}dirfile1-1.txt', f'.{s}dir1{s}dirfile1-2.txt']
+        )
+        self.assertEqual(scandir_mock.call_count, 2)
+
+    def test_max_results_processes(self):
+        s = os.path.sep
+        finder = find.Finder()
+        finder.add_root('.')
+        finder.append_matcher(find.NameMatcher('dirfile*'))
+        finder.set_processes(2)
+        output = StringIO()
+        finder.add_action(find.PrintAction(file=output))
+        self.assertIsNone(finder.execute(return_list=False, max_results=4))
+        self.assertEqual(output.getvalue().split('\n'), [
+            f'.{s}dir1{s}dirfile1-1.txt', f'.{s}dir1{s}dirfile1-2.txt', f'.{s}dir1{s}dirfile1-3.txt',
+            f'.{s}dir2{s}dirfile2-1.txt', ''
+        ])
+
+    def test_order_readdir(self):
+        with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+            find.main(['.'])
+            expected = fake_out.getvalue().split('\n')
+        with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+            find.main(['.', '-order', 'readdir'])
+            lines = fake_out.getvalue().split('\n')
+        self.assertEqual(sorted(lines), sorted(expected))
+
+    def test_order_inode(self):
+        finder = find.Finder()
+        finder.add_root('dir1')
+        finder.set_min_depth(1)
+        finder.set_order(find.WalkOrder.INODE)
+        inodes = [os.stat(match.full_path).st_ino for match in finder.execute()]
+        self.assertEqual(len(inodes), 3)
+        self.assertEqual(inodes, sorted(inodes))
+
+    def test_xdev(self):
+        finder = find.Finder()
+        finder.add_root('.')
+        finder.set_xdev(True)
+        root_dev = os.stat('.').st_dev
+        s = os.path.sep
+
+        def get_dev(path_parser):
+            # Pretend dir2 is a mount point
+            if path_parser.full_path == f'.{s}dir2':
+                return root_dev + 1
+            return path_parser.stat.st_dev
+
+        with patch.object(find.Finder, '_get_dev', side_effect=get_dev):
+            names = [match.name for match in finder.execute()]
+        self.assertIn('dir2', names)
+        self.assertIn('dirfile1-1.txt', names)
+        self.assertNotIn('dirfile2-1.txt', names)
+
+    def test_mount(self):
+        with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+            find.main(['.'])
+            expected = fake_out.getvalue()
+        with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+            find.main(['.', '-mount'])
+            self.assertEqual(fake_out.getvalue(), expected)
+
+    def _make_link_tree(self):
+        ''' Creates a tree with a link to a directory and a loop under a new temporary directory '''
+        link_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(link_dir.cleanup)
+        os.mkdir(os.path.join(link_dir.name, 'a'))
+        with open(os.path.join(link_dir.name, 'a', 'f.txt'), 'w'):
+            pass
+        try:
+            os.symlink('a', os.path.join(link_dir.name, 'link'), target_is_directory=True)
+            os.symlink('..', os.path.join(link_dir.name, 'a', 'loop'), target_is_directory=True)
+        except (OSError, NotImplementedError):
+            self.skipTest('Symbolic links are not supported')
+        return link_dir.name
+
+    def test_symlink_never_followed(self):
+        root = self._make_link_tree()
+        with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+            find.main([root, '-type', 'l', '-printf', '%P\\n'])
+            self.assertEqual(
+                sorted(fake_out.getvalue().splitlines()), ['a' + os.path.sep + 'loop', 'link'])
+        with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+            find.main([root, '-name', 'f.txt', '-printf', '%P\\n'])
+            self.assertEqual(fake_out.getvalue().splitlines(), ['a' + os.path.sep + 'f.txt'])
+
+    def test_symlink_follow_with_loop(self):
+        root = self._make_link_tree()
+        with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+            find.main(['-L', root, '-type', 'l'])
+            self.assertEqual(fake_out.getvalue(), '')
+        # Each directory is only walked once even though a/loop points back to the root
+        with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+            find.main([root, '-follow', '-name', 'f.txt', '-printf', '%P\\n'])
+            self.assertEqual(fake_out.getvalue().splitlines(), ['a' + os.path.sep + 'f.txt'])
+
+    def test_symlink_follow_roots(self):
+        root = self._make_link_tree()
+        link = os.path.join(root, 'link')
+        with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+            find.main([link, '-name', 'f.txt'])
+            self.assertEqual(fake_out.getvalue(), '')
+        with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+            find.main(['-H', link, '-name', 'f.txt'])
+            self.assertEqual(fake_out.getvalue(), os.path.join(link, 'f.txt') + '\n')
+
+    def _get_stat_paths(self, cliargs):
+        ''' Returns the path of each item which fetched its stat data while running main() '''
+        stat_paths = []
+        set_stat = find.PathParser._set_stat
+        def record(path_parser):
+            stat_paths.append(path_parser.full_path)
+            set_stat(path_parser)
+        with patch.object(find.PathParser, '_set_stat', autospec=True, side_effect=record):
+            with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+                find.main(cliargs)
+        return (stat_paths, fake_out.getvalue())
+
+    def test_name_print_without_stat(self):
+        for action in [[], ['-printf', '%f\\n'], ['-pyprint', '{full_path}']]:
+            stat_paths, output = self._get_stat_paths(['.', '-name', 'file1.txt'] + action)
+            self.assertNotEqual(output, '')
+            # Only the root itself is checked for being a directory
+            self.assertEqual(stat_paths, ['.'])
+        stat_paths, output = self._get_stat_paths(['.', '-name', 'file1.txt', '-printf', '%s\\n'])
+        self.assertEqual(len(stat_paths), 2)
+
+    def test_action_needs(self):
+        self.assertEqual(find.PrintAction().needs, find.PathData.NAME)
+        self.assertEqual(
+            find.PrintfAction('%f %s %u %Tk %A@').needs,
+            find.PathData.NAME | find.PathData.STAT | find.PathData.OWNER | find.PathData.TIMES
+        )
+        self.assertEqual(
+            find.PyPrintAction('{name} {mtime:%Y} {type}').needs,
+            find.PathData.NAME | find.PathData.TIMES | find.PathData.TYPE
+        )
+        self.assertEqual(
+            find.PyExecuteAction(['echo', '{st_size}', '{link}']).needs,
+            find.PathData.NAME | find.PathData.STAT | find.PathData.LINK
+        )
+        matcher = find.GatedMatcher(find.NameMatcher('*'), find.TypeMatcher('f'))
+        self.assertEqual(matcher.needs, find.PathData.NAME | find.PathData.TYPE)
+
+    def test_prefetch(self):
+        with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+            find.main(['.', '-mmin', '-60', '-user', str(os.stat('.').st_uid)])
+            expected = fake_out.getvalue()
+        self.assertNotEqual(expected, '')
+        threads = set()
+        set_stat = find.PathParser._set_stat
+        def record(path_parser):
+            threads.add(threading.get_ident())
+            set_stat(path_parser)
+        with patch.object(find.PathParser, '_set_stat', autospec=True, side_effect=record):
+            with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+                find.main(['.', '-prefetch', '4', '-mmin', '-60', '-user', str(os.stat('.').st_uid)])
+                self.assertEqual(fake_out.getvalue(), expected)
+        # Stat data was fetched by the prefetch pool
+        self.assertTrue(threads - {threading.get_ident()})
+
+    def test_prefetch_not_needed(self):
+        finder = find.Finder()
+        finder.set_prefetch(4)
+        finder.append_matcher(find.NameMatcher('*.txt'))
+        self.assertFalse(finder._start_prefetch())
+        finder.append_matcher(find.StatTimeMatcher(find.ValueComparison.GREATER_THAN, 0.0, 'st_mtime'))
+        self.assertTrue(finder._start_prefetch())
+        finder._stop_prefetch()
+
+    def test_id_name_cache(self):
+        lookups = []
+        def get_name(id):
+            lookups.append(id)
+            if id != 0:
+                raise KeyError(id)
+            return 'root'
+        cache = find._IdNameCache(get_name, None, lambda: [(5, 'five'), (0, 'root')])
+        self.assertEqual(cache.get_name(0), 'root')
+        self.assertIsNone(cache.get_name(1))
+        # Misses are cached as well
+        self.assertEqual(cache.get_name(0), 'root')
+        self.assertIsNone(cache.get_name(1))
+        self.assertEqual(lookups, [0, 1])
+        cache.preload()
+        self.assertEqual(cache.get_name(5), 'five')
+        self.assertEqual(cache.get_id('five'), 5)
+        self.assertEqual(lookups, [0, 1])
+
+    @unittest.skipUnless(find.UID_ENABLED and find.GID_ENABLED, 'pwd and grp not supported')
+    def test_nouser_nogroup(self):
+        for option, cache in [('-nouser', find._user_names), ('-nogroup', find._group_names)]:
+            with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+                find.main(['.', '-preloadids', option])
+                self.assertEqual(fake_out.getvalue(), '')
+            with patch.object(cache, 'get_name', return_value=None):
+                with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+                    find.main(['.', '-maxdepth', '0', option, '-printf', '%u %g\\n'])
+                    stat = os.stat('.')
+                    if option == '-nouser':
+                        expected = '{} {}\n'.format(stat.st_uid, find._group_id_to_name(stat.st_gid))
+                    else:
+                        expected = '{} {}\n'.format(find._user_id_to_name(stat.st_uid), stat.st_gid)
+                    self.assertEqual(fake_out.getvalue(), expected)
+
+    def test_path_parser_compact(self):
+        s = os.path.sep
+        matches = find.Finder().execute('.')
+        self.assertFalse(hasattr(matches[0], '__dict__'))
+        dir_matches = [match for match in matches if match.root == f'.{s}dir1']
+        self.assertGreater(len(dir_matches), 1)
+        # Items of the same directory share their directory data
+        self.assertIs(dir_matches[0]._dir, dir_matches[1]._dir)
+        match = pickle.loads(pickle.dumps(dir_matches[0]))
+        self.assertEqual(match.full_path, dir_matches[0].full_path)
+        self.assertEqual(match.rel_dir, 'dir1')
+        self.assertEqual(match.get_rel_depth(), 2)
+        path_parser = find.PathParser('.', (f'.{s}dir1', 'file.txt'))
+        self.assertEqual(path_parser.full_path, f'.{s}dir1{s}file.txt')
+        self.assertEqual(path_parser.rel_dir, 'dir1')
+
+    def test_pymap_lazy(self):
+        path_parser = find.Finder().execute('.', max_results=2)[1]
+        pydict = path_parser.to_pydict()
+        pymap = path_parser.to_pymap()
+        with patch.object(find.PathParser, '_read_link') as read_link, \
+                patch('refind.find._user_id_to_name') as user_id_to_name:
+            self.assertEqual('{name} {st_size} {mtime}'.format_map(pymap),
+                             '{name} {st_size} {mtime}'.format(**pydict))
+            read_link.assert_not_called()
+            user_id_to_name.assert_not_called()
+        self.assertEqual(sorted(pymap.keys()), ['mtime', 'name', 'st_size'])
+        for key, value in pydict.items():
+            self.assertEqual(pymap[key], value)
+        with self.assertRaises(KeyError):
+            pymap['unknown']
+
+    def test_compiled_matcher(self):
+        items = find.Finder().execute('.')
+        expressions = [
+            ['-name', '*.txt'],
+            ['!', '-name', '*.txt', '-type', 'f'],
+            ['-name', 'file1*', '-o', '-not', '-type', 'd', '-name', '*2*'],
+            ['-type', 'd', '-o', '-name', '*3*', '-o', '-true', '-false'],
+            ['-path', '*dir1*', '-prune', '-o', '-name', '*'],
+            ['-mmin', '-60', '-o', '!', '-mtime', '+2'],
+            ['-newer', 'file1.txt', '-o', '!', '-cnewer', 'file2.txt', '-mmin', '0']
+        ]
+        for expression in expressions:
+            finder = find.Finder()
+            parser = find.FinderArgParser()
+            parser.parse(['.'] + expression, finder)
+            compiled = finder._matcher.compile()
+            for item in items:
+                self.assertEqual(compiled(item), finder._matcher.is_match(item), (expression, item))
+        self.assertEqual(find.StaticMatcher(True).compile()(None), True)
+
+    def test_optimization_order(self):
+        expression = ['-newer', 'file1.txt', '-type', 'f', '-name', 'nomatch*']
+        stat_paths, output = self._get_stat_paths(['.', '-O0'] + expression)
+        self.assertEqual(output, '')
+        self.assertGreater(len(stat_paths), 1)
+        for level in ['-O1', '-O3']:
+            stat_paths, output = self._get_stat_paths([level, '.'] + expression)
+            self.assertEqual(output, '')
+            # The name test rejects every item before stat is needed
+            self.assertEqual(stat_paths, ['.'])
+        finder = find.Finder()
+        find.FinderArgParser().parse(['.', '-empty', '-newer', 'file1.txt', '-type', 'd'], finder)
+        optimized = finder._matcher.optimize(3)
+        self.assertEqual(
+            [type(matcher) for matcher in optimized._get_operands()],
+            [find.TypeMatcher, find.StatTimeMatcher, find.EmptyMatcher]
+        )
+        # The source matcher is unchanged
+        self.assertIsInstance(finder._matcher.right_matcher, find.TypeMatcher)
+
+    def test_optimization_keeps_results(self):
+        expressions = [
+            ['-newer', 'file1.txt', '-o', '!', '-type', 'd', '-name', '*2*'],
+            ['-path', '*dir1*', '-type', 'd', '-prune', '-o', '-name', '*'],
+            ['-empty', '-o', '-false', '-o', '-name', 'file1*', '-type', 'f']
+        ]
+        for expression in expressions:
+            outputs = []
+            for level in ['-O0', '-O1', '-O2', '-O3']:
+                with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+                    find.main([level, '.'] + expression)
+                    outputs.append(fake_out.getvalue())
+            self.assertNotEqual(outputs[0], '')
+            self.assertEqual(outputs, [outputs[0]] * 4, expression)
+
+    def test_name_set_matcher(self):
+        patterns = ['file1.txt', '*.log', '*2.txt', 'fil*', '*.tar.gz', 'dir?', '[a-c]*', 'x*y', '*']
+        names = ['file1.txt', 'a.log', '.log', 'file2.txt', 'b.tar.gz', 'dir1', 'dir10', 'car', 'xy',
+                 'xzy', 'yx', 'log', 'file3.txt']
+        for count in range(1, len(patterns)):
+            matcher = find.NameSetMatcher(patterns[:count])
+            matcher = pickle.loads(pickle.dumps(matcher))
+            compiled = matcher.compile()
+            for name in names:
+                path_parser = find.PathParser('.', ('.', name))
+                expected = any(fnmatch.fnmatch(name, p) for p in patterns[:count])
+                self.assertEqual(compiled(path_parser), expected, (patterns[:count], name))
+                self.assertEqual(matcher.is_match(path_parser), expected, (patterns[:count], name))
+
+    def test_name_chain_merged(self):
+        expression = ['-name', 'file1.txt']
+        for i in range(2000):
+            expression += ['-o', '-name', '*{}.dat'.format(i)]
+        expression += ['-o', '-name', 'dir?']
+        finder = find.Finder()
+        find.FinderArgParser().parse(['.'] + expression, finder)
+        optimized = finder._matcher.optimize(1)
+        self.assertIsInstance(optimized, find.NameSetMatcher)
+        self.assertEqual(len(optimized.patterns), 2002)
+        outputs = []
+        for level in ['-O0', '-O1']:
+            with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+                find.main([level, '.'] + expression)
+                outputs.append(fake_out.getvalue())
+        self.assertIn('file1.txt', outputs[1])
+        self.assertEqual(outputs[0], outputs[1])
+
+    def test_alternating_chain(self):
+        # Each AND nests the OR before it, so gates are about 600 deep
+        expression = []
+        for i in range(300):
+            expression += ['-name', 'x{}'.format(i), '-type', 'f', '-o']
+        expression += ['-name', 'dir1', '-type', 'd', '-o', '-name', 'file2.txt']
+        s = os.path.sep
+        for level in ['-O0', '-O1', '-O3']:
+            with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+                find.main([level, '.', '-maxdepth', '1'] + expression)
+            self.assertEqual(
+                sorted(fake_out.getvalue().splitlines()), [f'.{s}dir1', f'.{s}file2.txt'], level)
+        finder = find.Finder()
+        find.FinderArgParser().parse(['.'] + expression, finder)
+        self.assertEqual(finder._matcher.cost, find.MatchCost.TYPE)
+        items = [find.PathParser('.', ('.', name)) for name in ['file1.txt', 'file2.txt', 'dir1']]
+        self.assertEqual(
+            [bool(result) for result in finder._matcher.compile_batch()(find.StatColumns(items))],
+            [False, True, True]
+        )
+
+    def test_match_batch(self):
+        items = list(find.Finder()._list_dir('.', '.', 1, []))
+        items.append(find.PathParser('.', ('.', 'missing.txt')))
+        now = os.stat('file1.txt').st_mtime
+        matchers = [
+            find.StatTimeIncrementMatcher(find.ValueComparison.LESS_THAN, 60.0, 60.0, now, 'st_mtime'),
+            find.StatTimeMatcher(find.ValueComparison.GREATER_THAN, now - 1, 'st_mtime'),
+            find.PermMatcher(os.stat('file1.txt').st_mode & 0o777),
+            find.GatedMatcher(
+                find.NameMatcher('file[12]*'),
+                find.PermMatcher(0o100, find.LogicOperation.AND),
+                find.LogicOperation.OR
+            )
+        ]
+        for matcher in matchers:
+            for invert in [False, True]:
+                matcher.set_invert(invert)
+                expected = [matcher.is_match(item) for item in items]
+                self.assertEqual(matcher.match_batch(find.StatColumns(items)), expected, matcher)
+                if not isinstance(matcher, find.GatedMatcher):
+                    # Items without stat data never match, even when inverted
+                    self.assertFalse(expected[-1])
+
+    def test_batch_keeps_results(self):
+        expressions = [
+            ['-mmin', '-60'],
+            ['-name', '*1*', '-perm', '-400', '-o', '-mtime', '+1']
+        ]
+        for expression in expressions:
+            outputs = []
+            for batch_size in [find.MIN_BATCH_SIZE, 1]:
+                with patch('refind.find.MIN_BATCH_SIZE', batch_size):
+                    with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+                        find.main(['.'] + expression)
+                        outputs.append(fake_out.getvalue())
+            self.assertNotEqual(outputs[0], '')
+            self.assertEqual(outputs[0], outputs[1], expression)
+
+    def test_empty(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        os.makedirs(os.path.join(root.name, 'full', 'empty_dir'))
+        with open(os.path.join(root.name, 'full', 'empty.txt'), 'w'):
+            pass
+        with open(os.path.join(root.name, 'full', 'data.txt'), 'w') as fd:
+            fd.write('data')
+        scanned = []
+        scan_dir = find.Finder._scan_dir
+        def record_scan_dir(finder, dir_path):
+            scanned.append(os.path.relpath(dir_path, root.name))
+            return scan_dir(finder, dir_path)
+        with patch.object(find.Finder, '_scan_dir', record_scan_dir):
+            with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+                find.main([root.name, '-empty', '-printf', '%P\\n'])
+                lines = fake_out.getvalue().splitlines()
+        s = os.path.sep
+        self.assertEqual(lines, [f'full{s}empty_dir', f'full{s}empty.txt'])
+        # The directory found to be empty isn't listed again
+        self.assertEqual(scanned, ['.', 'full'])
+
+    def test_links(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        with open(os.path.join(root.name, 'a.txt'), 'w'):
+            pass
+        with open(os.path.join(root.name, 'c.txt'), 'w'):
+            pass
+        try:
+            os.link(os.path.join(root.name, 'a.txt'), os.path.join(root.name, 'b.txt'))
+        except (OSError, NotImplementedError):
+            self.skipTest('Hard links are not supported')
+        for n, expected in [('2', ['a.txt', 'b.txt']), ('-2', ['c.txt']), ('+1', ['a.txt', 'b.txt'])]:
+            with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+                find.main([root.name, '-type', 'f', '-links', n, '-printf', '%P\\n'])
+                self.assertEqual(sorted(fake_out.getvalue().splitlines()), expected, n)
+        with self.assertRaises(ValueError):
+            find.main([root.name, '-links', '1.5'])
+
+    @unittest.skipUnless(hasattr(os, 'geteuid'), 'credentials not supported')
+    def test_access_from_stat(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        modes = {'r.txt': 0o604, 'rw.txt': 0o606, 'x.sh': 0o705, 'own.txt': 0o600}
+        for name, mode in modes.items():
+            path = os.path.join(root.name, name)
+            with open(path, 'w'):
+                pass
+            os.chmod(path, mode)
+        st = os.stat(root.name)
+        # Neither the owner nor in the group of any item, so the bits for others apply
+        credentials = (st.st_uid + 1, {st.st_gid + 1})
+        expected = {
+            '-readable': ['r.txt', 'rw.txt', 'x.sh'],
+            '-writable': ['rw.txt'],
+            '-executable': ['x.sh']
+        }
+        with patch('refind.find._credentials', credentials), \
+                patch('refind.find.os.access', side_effect=AssertionError('access called')):
+            for test, names in expected.items():
+                # -fastaccess applies to tests before and after it
+                for args in [['-fastaccess', test], [test, '-fastaccess']]:
+                    with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+                        find.main([root.name, '-type', 'f'] + args + ['-printf', '%P\\n'])
+                        self.assertEqual(sorted(fake_out.getvalue().splitlines()), names, args)
+        # Without -fastaccess, access is called for each item since stat data ignores ACLs
+        with patch('refind.find._credentials', credentials):
+            with patch('refind.find.os.access', return_value=False) as access:
+                with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+                    find.main([root.name, '-type', 'f', '-readable'])
+                self.assertEqual(fake_out.getvalue(), '')
+                self.assertEqual(access.call_count, len(modes))
+
+    @unittest.skipUnless(
+        hasattr(os, 'geteuid') and hasattr(os, 'ST_NOEXEC'), 'mount flags not supported')
+    def test_access_mount_flags(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        os.mkdir(os.path.join(root.name, 'd'))
+        os.chmod(os.path.join(root.name, 'd'), 0o707)
+        with open(os.path.join(root.name, 'x.sh'), 'w'):
+            pass
+        os.chmod(os.path.join(root.name, 'x.sh'), 0o707)
+        st = os.stat(root.name)
+        credentials = (st.st_uid + 1, {st.st_gid + 1})
+        flags = os.ST_NOEXEC | os.ST_RDONLY
+        with patch('refind.find._credentials', credentials), \
+                patch('refind.find._get_mount_flags', return_value=flags), \
+                patch('refind.find.os.access', return_value=False) as access:
+            # noexec only applies to regular files, so the directory is still searchable
+            with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+                find.main(
+                    [root.name, '-mindepth', '1', '-fastaccess', '-executable', '-printf', '%P\\n'])
+            self.assertEqual(fake_out.getvalue().splitlines(), ['d'])
+            self.assertEqual(
+                [call[0][0] for call in access.call_args_list],
+                [os.path.join(root.name, 'x.sh')])
+            # Whether read-only applies is left to os.access()
+            access.reset_mock()
+            with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+                find.main(
+                    [root.name, '-mindepth', '1', '-fastaccess', '-writable', '-printf', '%P\\n'])
+            self.assertEqual(fake_out.getvalue(), '')
+            self.assertEqual(access.call_count, 2)
+
+    def test_contains(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        contents = {'a.txt': 'alpha beta', 'b.txt': 'gamma', 'c.log': 'beta\ndelta', 'd.txt': ''}
+        for name, content in contents.items():
+            with open(os.path.join(root.name, name), 'w') as fd:
+                fd.write(content)
+        os.mkdir(os.path.join(root.name, 'beta'))
+        expressions = [
+            (['-contains', 'beta'], ['a.txt', 'c.log']),
+            (['-contains', 'beta', '-name', '*.txt'], ['a.txt']),
+            (['-regextype', 'py', '-grep', '^(gamma|delta)'], ['b.txt']),
+            (['-regextype', 'py', '-grep', '(?m)^(gamma|delta)'], ['b.txt', 'c.log']),
+            (['-not', '-contains', 'a', '-type', 'f'], ['d.txt'])
+        ]
+        for threshold in [find.ContentMatcher.MMAP_THRESHOLD, 1]:
+            with patch('refind.find.ContentMatcher.MMAP_THRESHOLD', threshold):
+                for expression, expected in expressions:
+                    with patch('refind.find.sys.stdout', new = StringIO()) as fake_out:
+                        find.main([root.name] + expression + ['-printf', '%P\\n'])
+                    self.assertEqual(sorted(fake_out.getvalue().splitlines()), expected, expression)
+        with self.assertRaises(ValueError):
+            find.main([root.name, '-regextype', 'py', '-grep', '(beta'])
+
+    def test_contains_evaluated_last(self):
+        finder = find.Finder()
+        find.FinderArgParser().parse(['.', '-contains', 'x', '-newer', 'file1.txt', '-name', 'a*'], finder)
+        for level in [1, 2, 3]:
+            optimized = finder._matcher.optimize(level)
+            self.assertEqual(
+                [type(matcher) for matcher in optimized._get_operands()],
+                [find.NameMatcher, find.StatTimeMatcher, find.ContentMatcher]
+            )
+        # Files of a directory are matched as one batch
+        finder._compile_matcher()
+        self.assertIsNotNone(finder._match_batch)
+
+    def test_contains_read_pool(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        for name in ['a.txt', 'b.txt', 'c.txt']:
+            with open(os.path.join(root.name, name), 'w') as fd:
+                fd.write(name)
+        finder = find.Finder()
+        find.FinderArgParser().parse([root.name, '-contains', '.txt'], finder)
+        walks = []
+        start_read_pool = find.Finder._start_read_pool
+        def record_start_read_pool(walk):
+            walks.append(walk)
+            return start_read_pool(walk)
+        with patch.object(find.Finder, '_start_read_pool', record_start_read_pool):
+            executors = []
+            for path_parser in finder:
+                executors.append(walks[0]._read_executor)
+            self.assertEqual(len(executors), 3)
+            self.assertIsNotNone(executors[0])
+            # The pool only lives while the walk is running, and only on the state of the walk
+            self.assertIsNone(walks[0]._read_executor)
+            self.assertIsNot(walks[0], finder)
+            self.assertIsNone(finder._read_executor)
+            self.assertTrue(executors[0]._shutdown)
+            # Files are read one at a time without a pool
+            finder.set_read_threads(1)
+            self.assertEqual(len(list(finder)), 3)
+            self.assertIsNone(walks[1]._read_executor)
+
+    def test_concurrent_walks(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        for i in range(3):
+            os.mkdir(os.path.join(root.name, 'd{}'.format(i)))
+            for name in ['a.txt', 'b.txt']:
+                with open(os.path.join(root.name, 'd{}'.format(i), name), 'w') as fd:
+                    fd.write(name)
+        walks = []
+        start_prefetch = find.Finder._start_prefetch
+        def record_start_prefetch(walk):
+            walks.append(walk)
+            return start_prefetch(walk)
+        for args in [['-contains', '.txt'], ['-j', '2', '-prefetch', '2', '-mmin', '-60']]:
+            del walks[:]
+            finder = find.Finder()
+            find.FinderArgParser().parse([root.name, '-type', 'f'] + args, finder)
+            with patch.object(find.Finder, '_start_prefetch', record_start_prefetch):
+                first = finder.iter()
+                second = finder.iter()
+                self.assertIsNotNone(next(first))
+                self.assertIsNotNone(next(second))
+            # Each walk has its own state, so ending one doesn't stop the other
+            self.assertEqual(len(walks), 2)
+            self.assertIsNot(walks[0], walks[1])
+            first.close()
+            self.assertIsNone(walks[0]._prefetch_executor)
+            self.assertIsNone(walks[0]._read_executor)
+            if '-contains' in args:
+                self.assertFalse(walks[1]._read_executor._shutdown)
+            else:
+                self.assertFalse(walks[1]._prefetch_executor._shutdown)
+            self.assertEqual(len(list(second)), 5, args)
+            self.assertIsNone(finder._prefetch_executor)
+            self.assertIsNone(finder._read_executor)
+
 if __name__ == '__main__':
     unittest.main()